@@ -1,22 +1,113 @@
 # Importación de módulos necesarios
 import sys  # Proporciona acceso a funciones y objetos del intérprete de Python.
-from datetime import datetime, timedelta  # Manejo de fechas y tiempos.
+import os  # Manejo de rutas y carpetas.
+import csv  # Lectura de las exportaciones de la sala de ordeñe.
+import io  # Lectura de las exportaciones a partir de la posición ya importada.
+import hashlib  # Huella del comienzo de las exportaciones, para reconocer un archivo reemplazado.
+import hmac  # Firma de los pedidos al servicio de sincronización.
+import secrets  # Clave compartida del servicio de sincronización.
+import calendar  # Cálculo de meses para el pronóstico de repuestos.
+import math  # Distancias entre tambos para el armado de rutas.
+import time  # Límite de tiempo de la optimización de rutas y esperas entre reintentos.
+import random  # Dispersión de las esperas entre reintentos de escritura.
+import gzip  # Compresión de los archivos de sincronización.
+import shutil  # Copia por partes al comprimir y descomprimir respaldos.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Servicio local de sincronización.
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Consultas en paralelo a varias bases.
+import asyncio  # Servicio local de consultas (muchas conexiones con un solo hilo).
+import threading  # El servicio de consultas corre en su propio hilo, lejos de la ventana.
+import queue  # Conexiones de solo lectura libres del servicio de consultas.
+import base64  # Marcas de paginación del servicio de consultas.
+from urllib.parse import urlsplit, parse_qsl  # Rutas y parámetros de los pedidos al servicio de consultas.
+import heapq  # Montículo (min-heap) para programar las alertas de vencimiento.
+import json  # Serialización de los parámetros de las reglas de intervalo.
+from functools import lru_cache  # Memoización del cálculo de intervalos.
+from datetime import date, datetime, timedelta  # Manejo de fechas y tiempos.
 import sqlite3  # Para interactuar con bases de datos SQLite.
 import tkinter as tk  # Para crear interfaces gráficas simples.
 from PyQt6.QtWidgets import (  # Componentes de PyQt6 para interfaces gráficas avanzadas.
     QApplication, QWidget, QVBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
-    QLabel, QLineEdit, QHBoxLayout, QMessageBox, QInputDialog, QHeaderView
+    QLabel, QLineEdit, QHBoxLayout, QMessageBox, QInputDialog, QHeaderView,
+    QSystemTrayIcon, QStyle, QDialog, QFileDialog
 )
 from PyQt6.QtGui import QColor  # Para manejar colores en la interfaz.
-from PyQt6.QtCore import Qt, QTimer  # Para manejar alineaciones y temporizadores.
+from PyQt6.QtCore import Qt, QTimer, QThread, QFileSystemWatcher, pyqtSignal  # Alineaciones, temporizadores e hilos.
 import requests
 
 __version__ = "1.1.3"
 
+# Acceso a la base de datos compartida por varias computadoras
+RUTA_DB = "clientes.db"
+TIEMPO_ESPERA_DB = 2  # Segundos que SQLite espera a que se libere un bloqueo antes de fallar.
+REINTENTOS_DB = 5  # Intentos de una transacción de escritura bloqueada por otra instancia.
+ESPERA_INICIAL_REINTENTO = 0.1  # Segundos de espera antes del primer reintento (se duplica en cada uno).
+INTERVALO_VIGILANCIA_MS = 2000  # Cada cuánto se revisa si otra instancia modificó la base de datos.
+
+# Excepción para cambios hechos por otra instancia sobre un cliente que se estaba modificando
+class ConflictoVersion(Exception):
+    pass
+
+# Función para abrir una conexión a la base de datos
+def conectar_db(ruta=None):
+    """Abre una conexión que espera a que otras instancias liberen la base de datos en vez de fallar enseguida"""
+    # No se usa el modo WAL: necesita memoria compartida y no funciona con la base en una unidad de red.
+    return sqlite3.connect(ruta or RUTA_DB, timeout=TIEMPO_ESPERA_DB)
+
+# Función que ejecuta una transacción de escritura reintentando si la base está bloqueada
+def ejecutar_con_reintentos(operacion):
+    """Ejecuta `operacion(cursor)` en una transacción y devuelve su resultado, con reintentos y espera creciente"""
+    espera = ESPERA_INICIAL_REINTENTO
+    for intento in range(REINTENTOS_DB):
+        conn = conectar_db()
+        try:
+            # BEGIN IMMEDIATE toma el bloqueo de escritura al empezar: nunca falla a mitad de la transacción.
+            conn.execute("BEGIN IMMEDIATE")
+            resultado = operacion(conn.cursor())
+            conn.commit()
+            return resultado
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            bloqueada = "locked" in str(e) or "busy" in str(e)
+            if not bloqueada or intento == REINTENTOS_DB - 1:
+                raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        time.sleep(espera + random.uniform(0, espera))
+        espera *= 2
+
+# Función que reserva la modificación de un cliente si nadie lo cambió desde que se leyó
+def reservar_version(cursor, id_cliente, version):
+    """Incrementa la versión del cliente y la devuelve; lanza ConflictoVersion si ya no es la leída"""
+    # version None: el cliente no está en pantalla, así que no hay una lectura anterior que pueda estar vieja.
+    cursor.execute("UPDATE clientes SET version = version + 1 WHERE id = ? AND (? IS NULL OR version = ?)",
+                   (id_cliente, version, version))
+    if cursor.rowcount == 0:
+        raise ConflictoVersion("El cliente fue modificado o eliminado desde otra computadora.")
+    if version is None:
+        cursor.execute("SELECT version FROM clientes WHERE id = ?", (id_cliente,))
+        return cursor.fetchone()[0]
+    return version + 1
+
+# Sincronización entre bases de datos
+SELLO_TIEMPO_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"  # Momento del cambio, en UTC con milisegundos.
+ID_INSTANCIA_SQL = "(SELECT valor FROM configuracion WHERE clave = 'id_instancia')"
+# Datos de los clientes que viajan entre bases (id y version son locales de cada base)
+CAMPOS_SINCRONIZADOS = (
+    "nombre", "vacas", "ultimo_cambio", "intervalo", "ultimo_cambio_pezoneras", "proximo_cambio_pezoneras",
+    "proximo_cambio_mangueras", "ordenes", "bajadas", "ultimo_cambio_pulsadores", "proximo_cambio_pulsadores",
+    "ultimo_chequeo", "proximo_chequeo", "latitud", "longitud",
+)
+# Campos que cambia el usuario: solo estos sellan el cliente. Las fechas de próximo cambio se recalculan
+# en cada base (reglas, ordeñes importados) y viajan junto con el resto, pero no cuentan como un cambio propio.
+CAMPOS_SELLADOS = tuple(campo for campo in CAMPOS_SINCRONIZADOS if not campo.startswith("proximo_"))
+
 # Función para inicializar la base de datos SQLite
-def initialize_db():
-    """Inicializa la base de datos SQLite y asegura que todas las columnas necesarias existan"""
-    conn = sqlite3.connect("clientes.db")
+def initialize_db(ruta=None):
+    """Inicializa la base de datos SQLite (la de uso o la indicada) y asegura que todas las columnas necesarias existan"""
+    conn = conectar_db(ruta)
     cursor = conn.cursor()
 
     # Verificar si faltan columnas en la tabla
@@ -41,10 +132,2033 @@ def initialize_db():
         cursor.execute("ALTER TABLE clientes ADD COLUMN ultimo_cambio_pulsadores TEXT")
     if "proximo_cambio_pulsadores" not in columns:
         cursor.execute("ALTER TABLE clientes ADD COLUMN proximo_cambio_pulsadores TEXT")
+    if "version" not in columns:
+        cursor.execute("ALTER TABLE clientes ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    if "latitud" not in columns:
+        cursor.execute("ALTER TABLE clientes ADD COLUMN latitud REAL")
+    if "longitud" not in columns:
+        cursor.execute("ALTER TABLE clientes ADD COLUMN longitud REAL")
+    if "uid" not in columns:
+        cursor.execute("ALTER TABLE clientes ADD COLUMN uid TEXT")
+    if "modificado" not in columns:
+        cursor.execute("ALTER TABLE clientes ADD COLUMN modificado TEXT")
+    if "origen" not in columns:
+        cursor.execute("ALTER TABLE clientes ADD COLUMN origen TEXT")
+
+    # Índices para la consulta de vencimientos
+    for _, proximo in COMPONENTES.values():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_clientes_{proximo} ON clientes ({proximo})")
+    # Índice para recorrer la tabla por páginas en orden alfabético
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_nombre ON clientes (nombre COLLATE NOCASE, id)")
+
+    # Configuración general de la aplicación (clave -> valor)
+    cursor.execute("CREATE TABLE IF NOT EXISTS configuracion (clave TEXT PRIMARY KEY, valor TEXT)")
+    inicializar_sincronizacion(cursor)
+
+    # Reglas de intervalo por componente y, opcionalmente, por cliente (id_cliente NULL = regla general)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reglas_intervalo (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            componente TEXT NOT NULL,
+            id_cliente INTEGER,
+            tipo TEXT NOT NULL,
+            parametros TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_reglas_componente_cliente
+        ON reglas_intervalo (componente, IFNULL(id_cliente, 0))
+    """)
+    for componente, (tipo, parametros) in REGLAS_POR_DEFECTO.items():
+        cursor.execute("""
+            INSERT INTO reglas_intervalo (componente, id_cliente, tipo, parametros)
+            SELECT ?, NULL, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM reglas_intervalo WHERE componente = ? AND id_cliente IS NULL)
+        """, (componente, tipo, json.dumps(parametros, sort_keys=True), componente))
+
+    # El alta no guardaba el próximo cambio de pulsadores (la tabla lo calcula al mostrarlo) y esos clientes
+    # quedaban afuera de las consultas por fecha. Se completa una sola vez: ahora el alta ya lo guarda.
+    cursor.execute("SELECT 1 FROM clientes WHERE proximo_cambio_pulsadores IS NULL LIMIT 1")
+    if cursor.fetchone():
+        reglas = MotorReglas()
+        reglas.cargar(cursor)
+        reglas.completar_proximos(cursor, "pulsadores")
+
+    # Contadores de ordeñes por unidad acumulados desde las exportaciones de la sala de ordeñe
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS uso_ordenie (
+            id_cliente INTEGER PRIMARY KEY,
+            ordenes_totales INTEGER NOT NULL DEFAULT 0,
+            ordenes_pezoneras INTEGER NOT NULL DEFAULT 0,
+            ordenes_pulsadores INTEGER NOT NULL DEFAULT 0,
+            ultima_sesion TEXT
+        )
+    """)
+    # Hasta dónde se importó cada archivo, para no volver a leer lo ya importado
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lecturas_ordenie (
+            nombre TEXT PRIMARY KEY,
+            posicion INTEGER NOT NULL,
+            huella TEXT,
+            tamano INTEGER NOT NULL,
+            modificado REAL NOT NULL,
+            importado TEXT NOT NULL,
+            sesiones INTEGER NOT NULL,
+            error TEXT
+        )
+    """)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archivos_ordenie'")
+    if cursor.fetchone():
+        # Tabla anterior (un registro por nombre, tamaño y fecha): se toma como leído hasta el mayor tamaño.
+        cursor.execute("""
+            INSERT OR IGNORE INTO lecturas_ordenie (nombre, posicion, tamano, modificado, importado, sesiones)
+            SELECT nombre, MAX(tamano), MAX(tamano), MAX(modificado), MAX(importado), SUM(sesiones)
+            FROM archivos_ordenie GROUP BY nombre
+        """)
+        cursor.execute("DROP TABLE archivos_ordenie")
+    inicializar_archivo(cursor)
+    inicializar_resumen(cursor)
 
     conn.commit()
     conn.close()
 
+# Función que crea el registro de cambios usado para sincronizar bases de datos sin conexión
+def inicializar_sincronizacion(cursor):
+    """Identifica la base de datos y los clientes, y crea el registro de cambios con sus disparadores"""
+    cursor.execute("INSERT OR IGNORE INTO configuracion (clave, valor) VALUES ('id_instancia', lower(hex(randomblob(8))))")
+
+    # Los clientes se identifican por uid entre bases de datos: el id es distinto en cada computadora.
+    cursor.execute(f"""
+        UPDATE clientes
+        SET uid = IFNULL(uid, lower(hex(randomblob(16)))),
+            modificado = IFNULL(modificado, {SELLO_TIEMPO_SQL}),
+            origen = IFNULL(origen, {ID_INSTANCIA_SQL})
+        WHERE uid IS NULL OR modificado IS NULL OR origen IS NULL
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_clientes_uid ON clientes (uid)")
+
+    # Una entrada por cliente con el número de secuencia de su último cambio (las bajas quedan como lápida).
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS registro_cambios (
+            secuencia INTEGER PRIMARY KEY AUTOINCREMENT,
+            uid TEXT NOT NULL UNIQUE,
+            eliminado INTEGER NOT NULL DEFAULT 0,
+            modificado TEXT,
+            origen TEXT,
+            recibido_de TEXT
+        )
+    """)
+    # Sin OR IGNORE: en tablas AUTOINCREMENT reescribe la base en cada inicio aunque no inserte nada.
+    cursor.execute("""
+        INSERT INTO registro_cambios (uid)
+        SELECT uid FROM clientes WHERE uid NOT IN (SELECT uid FROM registro_cambios)
+    """)
+
+    # Otras bases de datos con las que se sincroniza y hasta qué secuencia se intercambiaron cambios
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pares_sincronizacion (
+            id_instancia TEXT PRIMARY KEY,
+            enviado_hasta INTEGER NOT NULL DEFAULT 0,
+            recibido_hasta INTEGER NOT NULL DEFAULT 0,
+            ultima_sincronizacion TEXT
+        )
+    """)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_alta AFTER INSERT ON clientes
+        BEGIN
+            UPDATE clientes
+            SET uid = IFNULL(NEW.uid, lower(hex(randomblob(16)))),
+                modificado = IFNULL(NEW.modificado, {SELLO_TIEMPO_SQL}),
+                origen = IFNULL(NEW.origen, {ID_INSTANCIA_SQL})
+            WHERE id = NEW.id AND (NEW.uid IS NULL OR NEW.modificado IS NULL OR NEW.origen IS NULL);
+            INSERT OR REPLACE INTO registro_cambios (uid, eliminado, modificado, origen)
+            VALUES ((SELECT uid FROM clientes WHERE id = NEW.id), 0, NULL, NULL);
+        END
+    """)
+    # Versiones anteriores sellaban cualquier UPDATE (también los recálculos y los aumentos de versión).
+    cursor.execute("DROP TRIGGER IF EXISTS trg_clientes_sello")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_clientes_registro")
+    # Sella los cambios locales de datos del usuario; los que llegan de otra base traen su propio sello.
+    cambiados = " OR ".join(f"NEW.{campo} IS NOT OLD.{campo}" for campo in CAMPOS_SELLADOS)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_sello_datos AFTER UPDATE OF {', '.join(CAMPOS_SELLADOS)} ON clientes
+        WHEN NEW.modificado IS OLD.modificado AND ({cambiados})
+        BEGIN
+            UPDATE clientes SET modificado = {SELLO_TIEMPO_SQL}, origen = {ID_INSTANCIA_SQL} WHERE id = NEW.id;
+        END
+    """)
+    # Solo un cliente con sello nuevo (propio o recibido) queda pendiente de enviar.
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_registro_sello AFTER UPDATE OF modificado, origen ON clientes
+        WHEN NEW.uid IS NOT NULL AND (NEW.modificado IS NOT OLD.modificado OR NEW.origen IS NOT OLD.origen)
+        BEGIN
+            INSERT OR REPLACE INTO registro_cambios (uid, eliminado, modificado, origen)
+            VALUES (NEW.uid, 0, NULL, NULL);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_clientes_baja AFTER DELETE ON clientes
+        BEGIN
+            INSERT OR REPLACE INTO registro_cambios (uid, eliminado, modificado, origen)
+            VALUES (OLD.uid, 1, {SELLO_TIEMPO_SQL}, {ID_INSTANCIA_SQL});
+        END
+    """)
+
+# Función que arma el paquete de cambios pendientes de enviar a otra base de datos
+def generar_delta(cursor, destino=None):
+    """Devuelve un diccionario con los cambios del registro posteriores a lo que `destino` ya confirmó"""
+    cursor.execute("SELECT valor FROM configuracion WHERE clave = 'id_instancia'")
+    id_instancia = cursor.fetchone()[0]
+    cursor.execute("SELECT enviado_hasta, recibido_hasta FROM pares_sincronizacion WHERE id_instancia = ?", (destino,))
+    enviado_hasta, recibido_hasta = cursor.fetchone() or (0, 0)
+
+    # `hasta` se fija antes de leer: lo que el destino confirme después nunca pasa de lo que se le envió,
+    # aunque otra instancia registre cambios mientras tanto (quedan para el próximo envío).
+    cursor.execute("SELECT IFNULL(MAX(secuencia), 0) FROM registro_cambios")
+    hasta = cursor.fetchone()[0]
+
+    # Solo las entradas nuevas del registro; lo que un destino conocido cambió o nos envió no se le devuelve.
+    campos = ", ".join(f"c.{campo}" for campo in CAMPOS_SINCRONIZADOS)
+    cursor.execute(f"""
+        SELECT r.secuencia, r.uid, r.eliminado, IFNULL(c.modificado, r.modificado), IFNULL(c.origen, r.origen), {campos}
+        FROM registro_cambios r LEFT JOIN clientes c ON c.uid = r.uid
+        WHERE r.secuencia > ? AND r.secuencia <= ?
+          AND (? IS NULL OR (IFNULL(c.origen, r.origen) IS NOT ? AND r.recibido_de IS NOT ?))
+        ORDER BY r.secuencia
+    """, (enviado_hasta, hasta, destino, destino, destino))
+    cambios = []
+    for secuencia, uid, eliminado, modificado, origen, *valores in cursor.fetchall():
+        cambio = {"uid": uid, "eliminado": eliminado, "modificado": modificado, "origen": origen}
+        if not eliminado:
+            cambio["datos"] = dict(zip(CAMPOS_SINCRONIZADOS, valores))
+        cambios.append(cambio)
+
+    return {
+        "formato": 1,
+        "origen": id_instancia,
+        "hasta": hasta,
+        "confirmado": recibido_hasta,  # Hasta qué secuencia del destino ya tenemos aplicados sus cambios.
+        "cambios": cambios,
+    }
+
+# Función que aplica el paquete de cambios recibido de otra base de datos
+def aplicar_delta(cursor, delta, enviado=None):
+    """Aplica los cambios más nuevos que los locales y devuelve la cantidad de clientes modificados"""
+    if delta.get("formato") != 1:
+        raise ValueError("El archivo de sincronización no tiene un formato conocido.")
+
+    aplicados = 0
+    for cambio in delta["cambios"]:
+        uid = cambio["uid"]
+        remoto = (cambio["modificado"] or "", cambio["origen"] or "")
+
+        # Sello local: el del cliente si existe o el de su lápida si fue eliminado.
+        cursor.execute("SELECT id, modificado, origen FROM clientes WHERE uid = ?", (uid,))
+        fila = cursor.fetchone()
+        if fila is None:
+            cursor.execute("SELECT modificado, origen FROM registro_cambios WHERE uid = ? AND eliminado = 1", (uid,))
+            lapida = cursor.fetchone()
+            local = (lapida[0] or "", lapida[1] or "") if lapida else None
+        else:
+            local = (fila[1] or "", fila[2] or "")
+
+        # Gana el sello (momento, instancia) mayor: el resultado es el mismo en todas las bases.
+        if local is not None and remoto <= local:
+            continue
+
+        if cambio["eliminado"]:
+            if fila is not None:
+                archivar_cliente(cursor, fila[0])  # La baja de otra computadora también se archiva aquí.
+            cursor.execute("""
+                INSERT OR REPLACE INTO registro_cambios (uid, eliminado, modificado, origen) VALUES (?, 1, ?, ?)
+            """, (uid, *remoto))
+        elif fila is not None:
+            datos = cambio["datos"]
+            asignaciones = ", ".join(f"{campo} = ?" for campo in CAMPOS_SINCRONIZADOS)
+            cursor.execute(f"""
+                UPDATE clientes SET {asignaciones}, modificado = ?, origen = ?, version = version + 1 WHERE id = ?
+            """, (*(datos.get(campo) for campo in CAMPOS_SINCRONIZADOS), *remoto, fila[0]))
+        else:
+            datos = cambio["datos"]
+            # Restaurado en otra computadora: sale del archivo local con sus ordeñes y reglas propias.
+            cursor.execute("SELECT uso_ordenie, reglas_propias FROM clientes_archivados WHERE uid = ?", (uid,))
+            datos_propios = cursor.fetchone()
+            cursor.execute("DELETE FROM clientes_archivados WHERE uid = ?", (uid,))
+            cursor.execute(f"""
+                INSERT INTO clientes ({', '.join(CAMPOS_SINCRONIZADOS)}, uid, modificado, origen)
+                VALUES ({', '.join('?' * len(CAMPOS_SINCRONIZADOS))}, ?, ?, ?)
+            """, (*(datos.get(campo) for campo in CAMPOS_SINCRONIZADOS), uid, *remoto))
+            if datos_propios is not None:
+                devolver_datos_propios(cursor, cursor.lastrowid, *datos_propios)
+        cursor.execute("UPDATE registro_cambios SET recibido_de = ? WHERE uid = ?", (delta["origen"], uid))
+        aplicados += 1
+
+    # Se recuerda hasta dónde llegaron los cambios del otro y hasta dónde confirmó los nuestros
+    # (nunca más allá de `enviado`, el `hasta` del paquete que se le mandó en este mismo intercambio).
+    cursor.execute("""
+        INSERT INTO pares_sincronizacion (id_instancia, enviado_hasta, recibido_hasta, ultima_sincronizacion)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (id_instancia) DO UPDATE SET
+            enviado_hasta = MAX(enviado_hasta, excluded.enviado_hasta),
+            recibido_hasta = MAX(recibido_hasta, excluded.recibido_hasta),
+            ultima_sincronizacion = excluded.ultima_sincronizacion
+    """, (delta["origen"], delta["confirmado"] if enviado is None else min(delta["confirmado"], enviado),
+          delta["hasta"], datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    return aplicados
+
+# Función que guarda en un archivo comprimido los cambios pendientes para otra base de datos
+def exportar_cambios(ruta, destino=None):
+    """Escribe el paquete de cambios para `destino` (None = todos) y devuelve la cantidad de cambios"""
+    conn = conectar_db()
+    delta = generar_delta(conn.cursor(), destino)
+    conn.close()
+    with gzip.open(ruta, "wt", encoding="utf-8") as archivo:
+        json.dump(delta, archivo, separators=(",", ":"))
+    return len(delta["cambios"])
+
+# Función que aplica un archivo de cambios generado por otra base de datos
+def importar_cambios(ruta):
+    """Lee un paquete de cambios y devuelve la cantidad de clientes modificados"""
+    with gzip.open(ruta, "rt", encoding="utf-8") as archivo:
+        delta = json.load(archivo)
+    return ejecutar_con_reintentos(lambda cursor: aplicar_delta(cursor, delta))
+
+# Función que firma un cuerpo de la sincronización con la clave compartida
+def firmar(clave, cuerpo):
+    """Devuelve el HMAC-SHA256 del cuerpo en hexadecimal"""
+    return hmac.new(clave.encode("utf-8"), cuerpo, hashlib.sha256).hexdigest()
+
+# Función que intercambia cambios con el servicio de sincronización de la oficina
+def sincronizar_con_servidor(url, clave):
+    """Envía los cambios locales, aplica los del servidor y devuelve (enviados, recibidos)"""
+    conn = conectar_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT valor FROM configuracion WHERE clave = 'id_servidor_sync'")
+    fila = cursor.fetchone()
+    delta = generar_delta(cursor, fila[0] if fila else None)
+    conn.close()
+
+    cuerpo = gzip.compress(json.dumps(delta, separators=(",", ":")).encode("utf-8"))
+    respuesta = requests.post(url.rstrip("/") + "/sincronizar", data=cuerpo,
+                              headers={"Content-Type": "application/json", "Content-Encoding": "gzip",
+                                       "X-Firma": firmar(clave, cuerpo)}, timeout=30)
+    if respuesta.status_code == 403:
+        raise PermissionError("El servidor rechazó la clave de sincronización.")
+    respuesta.raise_for_status()
+    if not hmac.compare_digest(respuesta.headers.get("X-Firma", ""), firmar(clave, respuesta.content)):
+        raise ValueError("La respuesta del servidor no está firmada con la clave de sincronización.")
+    delta_servidor = json.loads(gzip.decompress(respuesta.content))
+
+    def aplicar(cursor):
+        recibidos = aplicar_delta(cursor, delta_servidor, delta["hasta"])
+        cursor.execute("INSERT OR REPLACE INTO configuracion (clave, valor) VALUES ('id_servidor_sync', ?)",
+                       (delta_servidor["origen"],))
+        return recibidos
+
+    return len(delta["cambios"]), ejecutar_con_reintentos(aplicar)
+
+# Clase que atiende las sincronizaciones de las computadoras de campo
+class ManejadorSincronizacion(BaseHTTPRequestHandler):
+    def do_POST(self):
+        """Aplica los cambios recibidos y responde con los cambios que le faltan a quien llama"""
+        if self.path != "/sincronizar":
+            self.send_error(404)
+            return
+        try:
+            cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        # Solo las computadoras que conocen la clave compartida pueden enviar cambios.
+        if not hmac.compare_digest(self.headers.get("X-Firma", ""), firmar(self.server.clave, cuerpo)):
+            self.send_error(403, "Firma inválida")
+            return
+        try:
+            if self.headers.get("Content-Encoding") == "gzip":
+                cuerpo = gzip.decompress(cuerpo)
+            delta = json.loads(cuerpo)
+
+            def sincronizar(cursor):
+                aplicar_delta(cursor, delta)
+                return generar_delta(cursor, delta["origen"])
+
+            respuesta = gzip.compress(json.dumps(ejecutar_con_reintentos(sincronizar), separators=(",", ":")).encode("utf-8"))
+        except Exception as e:
+            self.send_error(400, str(e))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(respuesta)))
+        self.send_header("X-Firma", firmar(self.server.clave, respuesta))
+        self.end_headers()
+        self.wfile.write(respuesta)
+
+# Función que inicia el servicio de sincronización (sin interfaz gráfica)
+def servir_sincronizacion(puerto, direccion=None):
+    """Atiende sincronizaciones en la dirección y puerto indicados hasta que se interrumpa el proceso"""
+    def preparar(cursor):
+        # La dirección indicada se recuerda; sin ninguna se atiende solo a esta computadora.
+        if direccion is not None:
+            cursor.execute("INSERT OR REPLACE INTO configuracion (clave, valor) VALUES ('direccion_sync', ?)",
+                           (direccion,))
+        cursor.execute("INSERT OR IGNORE INTO configuracion (clave, valor) VALUES ('clave_sync', ?)",
+                       (secrets.token_hex(16),))
+        cursor.execute("SELECT clave, valor FROM configuracion WHERE clave IN ('direccion_sync', 'clave_sync')")
+        return dict(cursor.fetchall())
+
+    configuracion = ejecutar_con_reintentos(preparar)
+    direccion = configuracion.get("direccion_sync", "127.0.0.1")
+    servidor = ThreadingHTTPServer((direccion, puerto), ManejadorSincronizacion)
+    servidor.clave = configuracion["clave_sync"]
+    print(f"Servicio de sincronización escuchando en {direccion}:{puerto}")
+    print(f"Clave de sincronización (se ingresa en cada computadora de campo): {servidor.clave}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+# Función que devuelve las columnas de la tabla de clientes con su tipo
+def columnas_clientes(cursor):
+    """Devuelve una lista de (nombre, tipo) en el orden de la tabla"""
+    cursor.execute("PRAGMA table_info(clientes)")
+    return [(columna[1], columna[2]) for columna in cursor.fetchall()]
+
+# Función que crea la tabla de clientes archivados con las mismas columnas que la de clientes
+def inicializar_archivo(cursor):
+    """Crea la tabla de archivados y le agrega las columnas que la tabla de clientes haya ganado"""
+    # La primera versión guardaba el archivo por id, que un alta posterior puede volver a usar.
+    cursor.execute("PRAGMA table_info(clientes_archivados)")
+    por_id = any(columna[1] == "id" and columna[5] for columna in cursor.fetchall())
+    if por_id:
+        cursor.execute("ALTER TABLE clientes_archivados RENAME TO clientes_archivados_por_id")
+
+    # Tabla aparte: la de clientes solo guarda los activos y load_data no tiene que filtrar los dados de baja.
+    # Se identifica por uid; el id con que estaba el cliente queda solo como dato.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clientes_archivados (
+            uid TEXT PRIMARY KEY,
+            archivado TEXT NOT NULL,
+            uso_ordenie TEXT,
+            reglas_propias TEXT
+        )
+    """)
+    cursor.execute("PRAGMA table_info(clientes_archivados)")
+    existentes = {columna[1] for columna in cursor.fetchall()}
+    for nombre, tipo in columnas_clientes(cursor):
+        if nombre not in existentes:
+            cursor.execute(f"ALTER TABLE clientes_archivados ADD COLUMN {nombre} {tipo}")
+
+    if por_id:
+        cursor.execute("PRAGMA table_info(clientes_archivados_por_id)")
+        columnas = [columna[1] for columna in cursor.fetchall() if columna[1] != "uid"]
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO clientes_archivados (uid, {', '.join(columnas)})
+            SELECT IFNULL(uid, lower(hex(randomblob(16)))), {', '.join(columnas)} FROM clientes_archivados_por_id
+        """)
+        # Los ordeñes y reglas que siguen con el id viejo pasan al archivo, salvo que otro cliente ya use ese id.
+        cursor.execute("""
+            SELECT a.id, n.uid FROM clientes_archivados_por_id a JOIN clientes_archivados n ON n.id = a.id
+            WHERE a.id NOT IN (SELECT id FROM clientes)
+        """)
+        for id_cliente, uid in cursor.fetchall():
+            cursor.execute("UPDATE clientes_archivados SET uso_ordenie = ?, reglas_propias = ? WHERE uid = ?",
+                           (*separar_datos_propios(cursor, id_cliente), uid))
+        cursor.execute("DROP TABLE clientes_archivados_por_id")
+    # Después de migrar: el índice de la tabla anterior tenía el mismo nombre y se borró con ella.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archivados_nombre ON clientes_archivados (nombre)")
+
+# Función que crea los contadores del panel de resumen, mantenidos por disparadores
+def inicializar_resumen(cursor):
+    """Crea las tablas de resumen y sus disparadores, y las llena si todavía están vacías"""
+    # Se cuentan clientes por fecha de próximo cambio y no por estado: el estado cambia solo con el paso
+    # de los días, pero la cantidad por fecha solo cambia cuando se escribe un cliente.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_fechas (
+            componente TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            PRIMARY KEY (componente, fecha)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE TABLE IF NOT EXISTS resumen_totales (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+
+    cursor.execute("SELECT COUNT(*) FROM resumen_totales")
+    if cursor.fetchone()[0] == 0:
+        for componente, (_, proximo) in COMPONENTES.items():
+            cursor.execute(f"""
+                INSERT INTO resumen_fechas (componente, fecha, cantidad)
+                SELECT ?, {proximo}, COUNT(*) FROM clientes
+                WHERE NULLIF({proximo}, '') IS NOT NULL AND {proximo} < 'A' GROUP BY {proximo}
+            """, (componente,))
+        cursor.execute("INSERT INTO resumen_totales (clave, valor) SELECT 'vacas', IFNULL(SUM(vacas), 0) FROM clientes")
+
+    # Las primeras versiones de los disparadores contaban una fecha vacía como vencida.
+    cursor.execute("SELECT 1 FROM resumen_fechas WHERE fecha = '' LIMIT 1")
+    if cursor.fetchone():
+        cursor.execute("DELETE FROM resumen_fechas WHERE fecha = ''")
+    for anterior in ("trg_resumen_alta", "trg_resumen_baja", "trg_resumen_cambio"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {anterior}")
+
+    # Solo cuentan las fechas (< 'A' deja afuera "Sin datos"; NULLIF deja afuera NULL y vacío, como mostrar_fila).
+    def sumar(componente, proximo, fila, condicion=""):
+        return f"""
+            INSERT INTO resumen_fechas (componente, fecha, cantidad)
+            SELECT '{componente}', {fila}.{proximo}, 1
+            WHERE NULLIF({fila}.{proximo}, '') IS NOT NULL AND {fila}.{proximo} < 'A' {condicion}
+            ON CONFLICT (componente, fecha) DO UPDATE SET cantidad = cantidad + 1;"""
+
+    def restar(componente, proximo, fila, condicion=""):
+        return f"""
+            UPDATE resumen_fechas SET cantidad = cantidad - 1
+            WHERE componente = '{componente}' AND fecha = {fila}.{proximo} {condicion};
+            DELETE FROM resumen_fechas WHERE componente = '{componente}' AND fecha = {fila}.{proximo} AND cantidad <= 0;"""
+
+    columnas = [proximo for _, proximo in COMPONENTES.values()]
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_alta_cliente AFTER INSERT ON clientes
+        BEGIN
+            {"".join(sumar(componente, proximo, "NEW") for componente, (_, proximo) in COMPONENTES.items())}
+            UPDATE resumen_totales SET valor = valor + IFNULL(NEW.vacas, 0) WHERE clave = 'vacas';
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_baja_cliente AFTER DELETE ON clientes
+        BEGIN
+            {"".join(restar(componente, proximo, "OLD") for componente, (_, proximo) in COMPONENTES.items())}
+            UPDATE resumen_totales SET valor = valor - IFNULL(OLD.vacas, 0) WHERE clave = 'vacas';
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_cambio_cliente AFTER UPDATE OF vacas, {", ".join(columnas)} ON clientes
+        BEGIN
+            {"".join(restar(componente, proximo, "OLD", f"AND OLD.{proximo} IS NOT NEW.{proximo}") +
+                     sumar(componente, proximo, "NEW", f"AND OLD.{proximo} IS NOT NEW.{proximo}")
+                     for componente, (_, proximo) in COMPONENTES.items())}
+            UPDATE resumen_totales SET valor = valor - IFNULL(OLD.vacas, 0) + IFNULL(NEW.vacas, 0) WHERE clave = 'vacas';
+        END
+    """)
+
+# Función que devuelve lo que un cliente aporta al panel de resumen
+def estado_cliente(cursor, id_cliente):
+    """Devuelve (vacas, {componente: próximo cambio}) del cliente o None si no existe"""
+    columnas = ", ".join(proximo for _, proximo in COMPONENTES.values())
+    cursor.execute(f"SELECT vacas, {columnas} FROM clientes WHERE id = ?", (id_cliente,))
+    fila = cursor.fetchone()
+    if fila is None:
+        return None
+    return fila[0] or 0, dict(zip(COMPONENTES, fila[1:]))
+
+# Función que pasa un cliente a la tabla de archivados
+def archivar_cliente(cursor, id_cliente, version=None):
+    """Mueve el cliente al archivo; con `version` lanza ConflictoVersion si otro lo cambió desde que se leyó"""
+    condicion, parametros = ("AND version = ?", (id_cliente, version)) if version is not None else ("", (id_cliente,))
+    cursor.execute(f"SELECT 1 FROM clientes WHERE id = ? {condicion}", parametros)
+    if cursor.fetchone() is None:
+        raise ConflictoVersion("El cliente fue modificado o eliminado desde otra computadora.")
+    # El historial de ordeñes y las reglas propias viajan con el cliente al archivo: su id puede volver a usarse.
+    uso, reglas = separar_datos_propios(cursor, id_cliente)
+    columnas = ", ".join(nombre for nombre, _ in columnas_clientes(cursor))
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO clientes_archivados ({columnas}, archivado, uso_ordenie, reglas_propias)
+        SELECT {columnas}, ?, ?, ? FROM clientes WHERE id = ?
+    """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), uso, reglas, id_cliente))
+    cursor.execute("DELETE FROM clientes WHERE id = ?", (id_cliente,))
+
+# Función que saca de sus tablas los ordeñes acumulados y las reglas propias de un cliente
+def separar_datos_propios(cursor, id_cliente):
+    """Devuelve (contadores de ordeñes, reglas propias) en JSON o None, y los borra de sus tablas"""
+    cursor.execute("""
+        SELECT ordenes_totales, ordenes_pezoneras, ordenes_pulsadores, ultima_sesion FROM uso_ordenie WHERE id_cliente = ?
+    """, (id_cliente,))
+    uso = cursor.fetchone()
+    cursor.execute("SELECT componente, tipo, parametros FROM reglas_intervalo WHERE id_cliente = ?", (id_cliente,))
+    reglas = cursor.fetchall()
+    cursor.execute("DELETE FROM uso_ordenie WHERE id_cliente = ?", (id_cliente,))
+    cursor.execute("DELETE FROM reglas_intervalo WHERE id_cliente = ?", (id_cliente,))
+    return json.dumps(uso) if uso else None, json.dumps(reglas) if reglas else None
+
+# Función que devuelve a un cliente restaurado (con su id nuevo) los ordeñes acumulados y las reglas propias
+def devolver_datos_propios(cursor, id_cliente, uso, reglas):
+    """Vuelve a guardar lo que separó separar_datos_propios bajo el id indicado"""
+    if uso:
+        cursor.execute("""
+            INSERT OR REPLACE INTO uso_ordenie (id_cliente, ordenes_totales, ordenes_pezoneras, ordenes_pulsadores, ultima_sesion)
+            VALUES (?, ?, ?, ?, ?)
+        """, (id_cliente, *json.loads(uso)))
+    cursor.executemany("""
+        INSERT OR REPLACE INTO reglas_intervalo (componente, id_cliente, tipo, parametros) VALUES (?, ?, ?, ?)
+    """, [(componente, id_cliente, tipo, parametros) for componente, tipo, parametros in json.loads(reglas or "[]")])
+
+# Función que busca clientes archivados por nombre
+def buscar_archivados(cursor, texto=""):
+    """Devuelve una lista de (uid, nombre, vacas, fecha de archivo) ordenada por nombre"""
+    cursor.execute("""
+        SELECT uid, nombre, vacas, archivado FROM clientes_archivados
+        WHERE nombre LIKE ? ESCAPE '\\' ORDER BY nombre
+    """, ("%" + texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%",))
+    return cursor.fetchall()
+
+# Función que devuelve un cliente archivado a la tabla de clientes activos
+def restaurar_cliente(cursor, uid):
+    """Vuelve a dar de alta al cliente con un id nuevo, lo saca del archivo y devuelve el id"""
+    cursor.execute("SELECT uso_ordenie, reglas_propias FROM clientes_archivados WHERE uid = ?", (uid,))
+    datos_propios = cursor.fetchone()
+    if datos_propios is None:
+        raise ConflictoVersion("El cliente ya fue restaurado desde otra computadora.")
+    # Sin id: el que tenía puede estar en uso por otro cliente. Sin modificado ni origen: el disparador de alta
+    # los sella ahora, así la restauración le gana a la baja en las demás computadoras.
+    columnas = ", ".join(nombre for nombre, _ in columnas_clientes(cursor) if nombre not in ("id", "modificado", "origen"))
+    cursor.execute(f"INSERT INTO clientes ({columnas}) SELECT {columnas} FROM clientes_archivados WHERE uid = ?", (uid,))
+    id_cliente = cursor.lastrowid
+    devolver_datos_propios(cursor, id_cliente, *datos_propios)
+    cursor.execute("DELETE FROM clientes_archivados WHERE uid = ?", (uid,))
+    return id_cliente
+
+# Respaldos automáticos de la base de datos
+CARPETA_RESPALDOS = "respaldos"
+PAGINAS_POR_PASO = 64  # Páginas copiadas por paso: entre pasos la base queda libre para las demás conexiones.
+PAUSA_ENTRE_PASOS = 0.005  # Segundos de espera entre pasos de la copia.
+INTERVALO_RESPALDO_MS = 6 * 60 * 60 * 1000  # Cada cuánto se hace un respaldo mientras la aplicación está abierta.
+DIAS_CONSERVACION_RESPALDOS = 30  # Los respaldos más viejos se borran...
+MINIMO_RESPALDOS = 5  # ...pero siempre se conservan los más recientes.
+FORMATO_RESPALDO = "respaldo_%Y%m%d_%H%M%S"  # Seguido de un sufijo al azar: dos respaldos del mismo segundo no se pisan.
+EXTENSION_RESPALDO = ".db.gz"
+# Configuración que identifica a la base ante las demás y no debe volver atrás al restaurar un respaldo
+CLAVES_SINCRONIZACION = ("id_instancia", "id_servidor_sync", "clave_sync", "direccion_sync")
+
+# Función que copia la base de datos en uso a un respaldo comprimido
+def crear_respaldo(carpeta=CARPETA_RESPALDOS):
+    """Copia la base con la API de respaldo de SQLite, verifica la copia, la comprime y devuelve su ruta"""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"{datetime.now().strftime(FORMATO_RESPALDO)}_{secrets.token_hex(4)}{EXTENSION_RESPALDO}")
+    temporal = ruta[:-len(".gz")] + ".tmp"
+
+    # A diferencia de copiar el archivo, la API de respaldo nunca deja una copia a medio escribir:
+    # si otra conexión modifica la base durante la copia, SQLite la vuelve a empezar.
+    origen = conectar_db()
+    destino = sqlite3.connect(temporal)
+    try:
+        origen.backup(destino, pages=PAGINAS_POR_PASO, sleep=PAUSA_ENTRE_PASOS)
+        resultado = destino.execute("PRAGMA integrity_check").fetchone()[0]
+        if resultado != "ok":
+            raise sqlite3.DatabaseError(f"La copia no pasó la verificación de integridad: {resultado}")
+    finally:
+        destino.close()
+        origen.close()
+
+    try:
+        with open(temporal, "rb") as archivo, gzip.open(ruta + ".tmp", "wb") as comprimido:
+            shutil.copyfileobj(archivo, comprimido)
+        os.replace(ruta + ".tmp", ruta)  # Solo aparece en la carpeta cuando está completo.
+    finally:
+        os.remove(temporal)
+    return ruta
+
+# Función que lista los respaldos de la carpeta, del más reciente al más antiguo
+def listar_respaldos(carpeta=CARPETA_RESPALDOS):
+    """Devuelve una lista de (fecha, ruta) con los respaldos encontrados"""
+    if not os.path.isdir(carpeta):
+        return []
+    respaldos = []
+    largo_fecha = len(datetime.now().strftime(FORMATO_RESPALDO))
+    for nombre in os.listdir(carpeta):
+        if not nombre.endswith(EXTENSION_RESPALDO):
+            continue  # Archivos temporales u otros que no son respaldos.
+        try:
+            fecha = datetime.strptime(nombre[:largo_fecha], FORMATO_RESPALDO)
+        except ValueError:
+            continue
+        ruta = os.path.join(carpeta, nombre)
+        respaldos.append((fecha, os.path.getmtime(ruta), ruta))  # Dentro del mismo segundo ordena la fecha del archivo.
+    return [(fecha, ruta) for fecha, _, ruta in sorted(respaldos, reverse=True)]
+
+# Función que borra los respaldos más viejos que el tiempo de conservación
+def rotar_respaldos(carpeta=CARPETA_RESPALDOS, dias=DIAS_CONSERVACION_RESPALDOS):
+    """Borra los respaldos vencidos conservando siempre los más recientes y devuelve cuántos borró"""
+    limite = datetime.now() - timedelta(days=dias)
+    borrados = 0
+    for fecha, ruta in listar_respaldos(carpeta)[MINIMO_RESPALDOS:]:
+        if fecha < limite:
+            os.remove(ruta)
+            borrados += 1
+    return borrados
+
+# Función que lee el estado de sincronización que tiene que sobrevivir a una restauración
+def leer_estado_sincronizacion(cursor):
+    """Devuelve (configuración de sincronización, pares con sus confirmaciones, última secuencia del registro)"""
+    cursor.execute(f"SELECT clave, valor FROM configuracion WHERE clave IN ({', '.join('?' * len(CLAVES_SINCRONIZACION))})",
+                   CLAVES_SINCRONIZACION)
+    configuracion = cursor.fetchall()
+    cursor.execute("SELECT id_instancia, enviado_hasta, recibido_hasta, ultima_sincronizacion FROM pares_sincronizacion")
+    pares = cursor.fetchall()
+    cursor.execute("""
+        SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'registro_cambios'), 0),
+                   IFNULL((SELECT MAX(secuencia) FROM registro_cambios), 0))
+    """)
+    return configuracion, pares, cursor.fetchone()[0]
+
+# Función que pone en una base (la restaurada) el estado de sincronización de la base en uso
+def conservar_estado_sincronizacion(cursor, estado):
+    """Reemplaza configuración de sincronización y pares, y lleva la secuencia del registro a la de la base en uso"""
+    configuracion, pares, secuencia = estado
+    cursor.executemany("INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)", configuracion)
+    cursor.execute("DELETE FROM pares_sincronizacion")
+    cursor.executemany("""
+        INSERT INTO pares_sincronizacion (id_instancia, enviado_hasta, recibido_hasta, ultima_sincronizacion)
+        VALUES (?, ?, ?, ?)
+    """, pares)
+    # Los pares ya confirmaron secuencias hasta la de la base en uso: los cambios nuevos tienen que seguir después,
+    # si no quedarían por debajo de `enviado_hasta` y no se enviarían nunca.
+    cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'registro_cambios'", (secuencia,))
+    cursor.execute("""
+        INSERT INTO sqlite_sequence (name, seq) SELECT 'registro_cambios', ?
+        WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'registro_cambios')
+    """, (secuencia,))
+
+# Función que reemplaza la base de datos en uso por un respaldo
+def restaurar_respaldo(ruta, carpeta=CARPETA_RESPALDOS):
+    """Verifica el respaldo, guarda un respaldo del estado actual y copia el elegido sobre la base en uso"""
+    temporal = os.path.join(carpeta, f"restaurar_{secrets.token_hex(4)}.tmp")
+    with gzip.open(ruta, "rb") as comprimido, open(temporal, "wb") as archivo:
+        shutil.copyfileobj(comprimido, archivo)
+
+    try:
+        origen = sqlite3.connect(temporal)
+        try:
+            resultado = origen.execute("PRAGMA integrity_check").fetchone()[0]
+            if resultado != "ok":
+                raise sqlite3.DatabaseError(f"El respaldo está dañado: {resultado}")
+        finally:
+            origen.close()
+
+        # Todo se prepara en la copia antes de reemplazar la base: un respaldo de una versión anterior puede
+        # no tener las tablas nuevas, y la sincronización sigue desde donde estaba la base en uso.
+        initialize_db(temporal)
+        conn = conectar_db()
+        try:
+            estado = leer_estado_sincronizacion(conn.cursor())
+        finally:
+            conn.close()
+        origen = sqlite3.connect(temporal)
+        try:
+            conservar_estado_sincronizacion(origen.cursor(), estado)
+            origen.commit()
+            seguridad = crear_respaldo(carpeta)  # Permite deshacer la restauración.
+            # Copia completa en un solo paso: las demás instancias ven la base anterior o la restaurada, nunca una mezcla.
+            destino = conectar_db()
+            try:
+                origen.backup(destino)
+            finally:
+                destino.close()
+        finally:
+            origen.close()
+    finally:
+        os.remove(temporal)
+    return seguridad
+
+# Hilo que hace el respaldo programado sin bloquear la interfaz
+class HiloRespaldo(QThread):
+    terminado = pyqtSignal(str)  # Ruta del respaldo creado.
+    fallo = pyqtSignal(str)
+
+    def run(self):
+        """Crea un respaldo y borra los vencidos"""
+        try:
+            ruta = crear_respaldo()
+            rotar_respaldos()
+        except Exception as e:
+            self.fallo.emit(str(e))
+            return
+        self.terminado.emit(ruta)
+
+# Columnas de la base de datos de cada componente: (fecha del último cambio, fecha del próximo cambio)
+COMPONENTES = {
+    "pezoneras": ("ultimo_cambio_pezoneras", "proximo_cambio_pezoneras"),
+    "mangueras": ("ultimo_cambio", "proximo_cambio_mangueras"),
+    "pulsadores": ("ultimo_cambio_pulsadores", "proximo_cambio_pulsadores"),
+    "chequeo": ("ultimo_chequeo", "proximo_chequeo"),
+}
+
+# Reglas generales que reproducen los valores históricos del sistema
+TRAMOS_POR_DEFECTO = {"tramos": [[50, 45], [100, 30], [150, 30]], "resto": 20}
+REGLAS_POR_DEFECTO = {
+    "pezoneras": ("uso", {"constante": 2500}),
+    "mangueras": ("dias_fijos", {"dias": 180}),
+    "pulsadores": ("uso", {"constante": 7000}),
+    "chequeo": ("uso", {"constante": 7000}),
+}
+TIPOS_REGLA = {
+    "uso": "Según uso (constante / (vacas × ordeñes / bajadas))",
+    "dias_fijos": "Cantidad fija de días",
+    "por_rodeo": "Por tramos de tamaño del rodeo",
+}
+
+# Función que calcula los días hasta el próximo cambio según una regla
+@lru_cache(maxsize=4096)
+def calcular_dias(tipo, parametros, vacas, ordenes, bajadas):
+    """Devuelve los días de intervalo para una regla (parámetros en JSON) o None si faltan datos"""
+    valores = json.loads(parametros)
+    if tipo == "uso":
+        if not vacas or not ordenes or not bajadas or vacas <= 0 or ordenes <= 0 or bajadas <= 0:
+            return None
+        return int(valores["constante"] / (vacas * (ordenes / bajadas)))
+    if tipo == "dias_fijos":
+        return int(valores["dias"])
+    if tipo == "por_rodeo":
+        for limite, dias in valores["tramos"]:
+            if (vacas or 0) <= limite:
+                return int(dias)
+        return int(valores["resto"])
+    raise ValueError(f"Tipo de regla desconocido: {tipo}")
+
+# Clase que resuelve y aplica las reglas de intervalo guardadas en la base de datos
+class MotorReglas:
+    def __init__(self):
+        """Inicializa el motor con las reglas vacías"""
+        self.reglas = {}  # (componente, id_cliente o None) -> (tipo, parámetros en JSON)
+
+    def cargar(self, cursor=None):
+        """Lee todas las reglas de la base de datos (con el cursor indicado o una conexión propia)"""
+        conn = conectar_db() if cursor is None else None
+        cursor = cursor or conn.cursor()
+        cursor.execute("SELECT componente, id_cliente, tipo, parametros FROM reglas_intervalo")
+        self.reglas = {(componente, id_cliente): (tipo, parametros)
+                       for componente, id_cliente, tipo, parametros in cursor.fetchall()}
+        if conn is not None:
+            conn.close()
+
+    def regla(self, componente, id_cliente=None):
+        """Devuelve la regla del cliente si tiene una propia o, si no, la regla general"""
+        if (componente, id_cliente) in self.reglas:
+            return self.reglas[(componente, id_cliente)]
+        if (componente, None) in self.reglas:
+            return self.reglas[(componente, None)]
+        tipo, parametros = REGLAS_POR_DEFECTO[componente]
+        return tipo, json.dumps(parametros, sort_keys=True)
+
+    def dias(self, componente, id_cliente, vacas, ordenes, bajadas):
+        """Calcula los días de intervalo de un componente para un cliente"""
+        tipo, parametros = self.regla(componente, id_cliente)
+        return calcular_dias(tipo, parametros, vacas, ordenes, bajadas)
+
+    def proxima_fecha(self, componente, id_cliente, ultima_fecha, vacas, ordenes, bajadas):
+        """Calcula la fecha del próximo cambio a partir de la fecha del último (o "Sin datos")"""
+        if not ultima_fecha or ultima_fecha == "Sin datos":
+            return "Sin datos"
+        dias = self.dias(componente, id_cliente, vacas, ordenes, bajadas)
+        if dias is None:
+            return "Sin datos"
+        fecha = datetime.strptime(ultima_fecha, "%Y-%m-%d") + timedelta(days=dias)
+        return fecha.strftime("%Y-%m-%d")
+
+    def guardar_regla(self, componente, tipo, parametros, id_cliente=None):
+        """Guarda una regla y reprograma en una sola pasada a todos los clientes afectados"""
+        calcular_dias(tipo, json.dumps(parametros, sort_keys=True), 1, 1, 1)  # Valida la regla antes de guardarla.
+        parametros = json.dumps(parametros, sort_keys=True)
+
+        def guardar(cursor):
+            cursor.execute("""
+                DELETE FROM reglas_intervalo WHERE componente = ? AND IFNULL(id_cliente, 0) = IFNULL(?, 0)
+            """, (componente, id_cliente))
+            cursor.execute("""
+                INSERT INTO reglas_intervalo (componente, id_cliente, tipo, parametros) VALUES (?, ?, ?, ?)
+            """, (componente, id_cliente, tipo, parametros))
+            self.recalcular(cursor, componente, tipo, parametros, id_cliente)
+            if componente in COMPONENTES_POR_USO:
+                # Los clientes con ordeñes importados miden la vida útil por uso: la fecha la deciden los contadores.
+                if id_cliente is None:
+                    cursor.execute("SELECT id_cliente FROM uso_ordenie")
+                else:
+                    cursor.execute("SELECT id_cliente FROM uso_ordenie WHERE id_cliente = ?", (id_cliente,))
+                actualizar_vida_util(cursor, self, [fila[0] for fila in cursor.fetchall()])
+
+        # La regla nueva ya tiene que estar en memoria para actualizar_vida_util; si no se guarda, vuelve la anterior.
+        anterior = self.reglas.get((componente, id_cliente))
+        self.reglas[(componente, id_cliente)] = (tipo, parametros)
+        try:
+            ejecutar_con_reintentos(guardar)
+        except Exception:
+            if anterior is None:
+                del self.reglas[(componente, id_cliente)]
+            else:
+                self.reglas[(componente, id_cliente)] = anterior
+            raise
+
+    def completar_proximos(self, cursor, componente):
+        """Guarda el próximo cambio de los clientes que todavía no lo tienen (NULL) según su regla"""
+        ultimo, proximo = COMPONENTES[componente]
+        cursor.connection.create_function(
+            "dias_cliente", 4,
+            lambda id_cliente, vacas, ordenes, bajadas: self.dias(componente, id_cliente, vacas, ordenes, bajadas)
+        )
+        cursor.execute(f"""
+            UPDATE clientes
+            SET {proximo} = IFNULL(date({ultimo}, '+' || dias_cliente(id, vacas, ordenes, bajadas) || ' days'), 'Sin datos')
+            WHERE {proximo} IS NULL
+        """)
+
+    def recalcular(self, cursor, componente, tipo, parametros, id_cliente=None):
+        """Actualiza el próximo cambio de un componente con un único UPDATE sobre los clientes afectados"""
+        ultimo, proximo = COMPONENTES[componente]
+        cursor.connection.create_function(
+            "dias_regla", 3, lambda vacas, ordenes, bajadas: calcular_dias(tipo, parametros, vacas, ordenes, bajadas),
+            deterministic=True
+        )
+        if id_cliente is None:
+            # La regla general afecta a los clientes que no tienen una regla propia para el componente.
+            filtro = """id NOT IN (SELECT id_cliente FROM reglas_intervalo
+                                 WHERE componente = ? AND id_cliente IS NOT NULL)"""
+            argumentos = (componente,)
+        else:
+            filtro = "id = ?"
+            argumentos = (id_cliente,)
+
+        cursor.execute(f"""
+            UPDATE clientes
+            SET {proximo} = IFNULL(date({ultimo}, '+' || dias_regla(vacas, ordenes, bajadas) || ' days'), 'Sin datos'),
+                version = version + 1
+            WHERE {filtro}
+        """, argumentos)
+
+# Carpeta donde se dejan las exportaciones de la sala de ordeñe (CSV o JSON)
+CARPETA_ORDENIE = "ordenes_importar"
+TAMANO_BLOQUE_LECTURA = 64 * 1024  # Bytes leídos por vez de los archivos JSON.
+ESPERA_ARCHIVO_ESTABLE = 5  # Segundos sin cambios antes de importar un archivo (puede estar copiándose).
+BYTES_HUELLA = 4096  # Bytes del comienzo del archivo con los que se reconoce que es el mismo.
+# Componentes cuya vida útil se mide en ordeñes por unidad (columna del contador en uso_ordenie)
+COMPONENTES_POR_USO = {
+    "pezoneras": "ordenes_pezoneras",
+    "pulsadores": "ordenes_pulsadores",
+}
+
+# Función que recorre un archivo JSON (arreglo de objetos o un objeto por línea) sin cargarlo entero
+def leer_json_por_partes(archivo):
+    """Devuelve los objetos de un archivo JSON de a uno, leyendo en bloques de tamaño fijo"""
+    decodificador = json.JSONDecoder()
+    buffer = ""
+    posicion = 0
+    fin = False
+    while True:
+        # Saltear espacios, comas y corchetes que separan los objetos.
+        while posicion < len(buffer) and buffer[posicion] in " \t\r\n,[]":
+            posicion += 1
+        if posicion < len(buffer):
+            try:
+                objeto, posicion = decodificador.raw_decode(buffer, posicion)
+                yield objeto
+                continue
+            except json.JSONDecodeError:
+                if fin:
+                    raise
+        elif fin:
+            return
+
+        # Objeto incompleto o buffer agotado: se descarta lo ya leído y se agrega el siguiente bloque.
+        bloque = archivo.read(TAMANO_BLOQUE_LECTURA)
+        fin = not bloque
+        buffer = buffer[posicion:] + bloque
+        posicion = 0
+
+# Función que recorre las sesiones de ordeñe de una exportación como diccionarios
+def leer_sesiones(ruta, archivo, desde=0):
+    """Devuelve las filas de un archivo CSV o JSON (abierto en binario) de a una, a partir del byte `desde`"""
+    if ruta.lower().endswith((".json", ".jsonl")):
+        archivo.seek(desde)
+        texto = io.TextIOWrapper(archivo, encoding="utf-8-sig" if desde == 0 else "utf-8", newline="")
+        yield from leer_json_por_partes(texto)
+    else:
+        # El encabezado se lee siempre del comienzo, aunque se siga desde la mitad del archivo.
+        # Las planillas exportadas en español suelen usar ";" como separador.
+        primera_linea = archivo.readline().decode("utf-8-sig")
+        separador = ";" if primera_linea.count(";") > primera_linea.count(",") else ","
+        campos = next(csv.reader([primera_linea], delimiter=separador), [])
+        archivo.seek(max(desde, archivo.tell()))
+        texto = io.TextIOWrapper(archivo, encoding="utf-8", newline="")
+        yield from csv.DictReader(texto, fieldnames=campos, delimiter=separador)
+    texto.detach()  # El archivo lo cierra quien lo abrió.
+
+# Función que calcula la huella del comienzo de un archivo
+def huella_archivo(ruta, cantidad):
+    """Devuelve el SHA-256 de los primeros `cantidad` bytes, sin los separadores y cierres del final"""
+    with open(ruta, "rb") as archivo:
+        # Agregar sesiones a un arreglo JSON reescribe su "]" final: eso no cuenta como otro archivo.
+        return hashlib.sha256(archivo.read(cantidad).rstrip(b" \t\r\n,]")).hexdigest()
+
+# Función que anota una exportación que no se pudo leer, para no reintentarla hasta que cambie
+def registrar_error_ordenie(ruta, error):
+    """Guarda el error del archivo con su tamaño y fecha actuales"""
+    estado = os.stat(ruta)
+    ejecutar_con_reintentos(lambda cursor: cursor.execute("""
+        INSERT INTO lecturas_ordenie (nombre, posicion, tamano, modificado, importado, sesiones, error)
+        VALUES (?, 0, ?, ?, ?, 0, ?)
+        ON CONFLICT (nombre) DO UPDATE SET
+            tamano = excluded.tamano, modificado = excluded.modificado, error = excluded.error
+    """, (os.path.basename(ruta), estado.st_size, estado.st_mtime, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), error)))
+
+# Función que importa una exportación de la sala de ordeñe y acumula los contadores por cliente
+def importar_archivo_ordenie(ruta, reglas):
+    """Importa lo que el archivo agregó desde la última vez y devuelve la cantidad de sesiones leídas (o None)"""
+    estado = os.stat(ruta)
+    nombre = os.path.basename(ruta)
+
+    conn = conectar_db()
+    try:
+        lectura = leer_sesiones_nuevas(conn.cursor(), ruta, nombre, estado)
+    finally:
+        conn.close()
+    if lectura is None:
+        return None
+    # Solo la escritura toma el bloqueo (con reintentos): leer un archivo grande no hace esperar a la ventana.
+    return ejecutar_con_reintentos(lambda cursor: guardar_sesiones_ordenie(cursor, ruta, nombre, estado, reglas, *lectura))
+
+# Función que lee lo que se leyó antes de una exportación
+def leer_estado_ordenie(cursor, nombre):
+    """Devuelve (posición, huella, tamaño, fecha, sesiones, error) de la importación anterior o None"""
+    cursor.execute("SELECT posicion, huella, tamano, modificado, sesiones, error FROM lecturas_ordenie WHERE nombre = ?",
+                   (nombre,))
+    return cursor.fetchone()
+
+# Función que lee las sesiones nuevas de una exportación, sin escribir en la base
+def leer_sesiones_nuevas(cursor, ruta, nombre, estado):
+    """Devuelve (estado anterior, sesiones anteriores, acumulados, sesiones, posición) o None si no hay nada nuevo"""
+    leido = leer_estado_ordenie(cursor, nombre)
+    desde, sesiones_anteriores = 0, 0
+    if leido is not None:
+        posicion, huella, tamano, modificado, sesiones_anteriores, error = leido
+        if error is not None and (tamano, modificado) == (estado.st_size, estado.st_mtime):
+            return None  # No se pudo leer y no cambió desde entonces.
+        # Si el comienzo es el mismo, el archivo es el que ya se importó (un `touch`, otra copia o datos agregados).
+        if estado.st_size >= posicion and (huella is None or huella == huella_archivo(ruta, min(posicion, BYTES_HUELLA))):
+            if estado.st_size == posicion:
+                return None
+            desde = posicion
+        else:
+            sesiones_anteriores = 0  # Reemplazado por otra exportación con el mismo nombre: se lee entera.
+
+    # Datos de los clientes necesarios para asignar cada sesión (se leen una vez por archivo).
+    cursor.execute("SELECT id, nombre, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores FROM clientes")
+    ids_por_nombre = {}
+    ultimos_cambios = {}
+    for id_cliente, nombre_cliente, ultimo_pezoneras, ultimo_pulsadores in cursor.fetchall():
+        ids_por_nombre[(nombre_cliente or "").strip().lower()] = id_cliente
+        ultimos_cambios[id_cliente] = (ultimo_pezoneras or "", ultimo_pulsadores or "")
+
+    # Acumulados del archivo: la memoria depende de la cantidad de clientes, no del tamaño del archivo.
+    acumulados = {}  # id_cliente -> [totales, desde cambio de pezoneras, desde cambio de pulsadores, última fecha]
+    sesiones = 0
+    archivo = open(ruta, "rb")
+    try:
+        for sesion in leer_sesiones(ruta, archivo, desde):
+            try:
+                if sesion.get("id_cliente"):
+                    id_cliente = int(sesion["id_cliente"])
+                else:
+                    id_cliente = ids_por_nombre.get(str(sesion.get("cliente", "")).strip().lower())
+                fecha = str(sesion.get("fecha", ""))[:10]
+                cantidad = int(sesion.get("ordenes_unidad") or 1)  # Sin columna de cantidad, cada fila es un ordeñe.
+            except (TypeError, ValueError):
+                continue
+            if id_cliente not in ultimos_cambios:
+                continue
+
+            sesiones += 1
+            ultimo_pezoneras, ultimo_pulsadores = ultimos_cambios[id_cliente]
+            acumulado = acumulados.setdefault(id_cliente, [0, 0, 0, ""])
+            acumulado[0] += cantidad
+            # Las fechas YYYY-MM-DD se comparan como texto; "Sin datos" cuenta como sin cambio registrado.
+            if fecha >= ultimo_pezoneras or ultimo_pezoneras == "Sin datos":
+                acumulado[1] += cantidad
+            if fecha >= ultimo_pulsadores or ultimo_pulsadores == "Sin datos":
+                acumulado[2] += cantidad
+            acumulado[3] = max(acumulado[3], fecha)
+        posicion = archivo.tell()  # Se leyó hasta el final: desde aquí sigue la próxima vez.
+    finally:
+        archivo.close()
+    return leido, sesiones_anteriores, acumulados, sesiones, posicion
+
+# Función que guarda los contadores de una exportación y hasta dónde se leyó, en la misma transacción
+def guardar_sesiones_ordenie(cursor, ruta, nombre, estado, reglas, leido, sesiones_anteriores, acumulados, sesiones,
+                             posicion):
+    """Acumula los contadores leídos y devuelve la cantidad de sesiones (None si otra instancia ya lo importó)"""
+    if leer_estado_ordenie(cursor, nombre) != leido:
+        return None  # Otra computadora lo importó mientras se leía: la próxima vuelta sigue desde su posición.
+    cursor.executemany("""
+        INSERT INTO uso_ordenie (id_cliente, ordenes_totales, ordenes_pezoneras, ordenes_pulsadores, ultima_sesion)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (id_cliente) DO UPDATE SET
+            ordenes_totales = ordenes_totales + excluded.ordenes_totales,
+            ordenes_pezoneras = ordenes_pezoneras + excluded.ordenes_pezoneras,
+            ordenes_pulsadores = ordenes_pulsadores + excluded.ordenes_pulsadores,
+            ultima_sesion = MAX(IFNULL(ultima_sesion, ''), excluded.ultima_sesion)
+    """, [(id_cliente, *acumulado) for id_cliente, acumulado in acumulados.items()])
+    actualizar_vida_util(cursor, reglas, list(acumulados))
+    cursor.execute("""
+        INSERT OR REPLACE INTO lecturas_ordenie (nombre, posicion, huella, tamano, modificado, importado, sesiones, error)
+        VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+    """, (nombre, posicion, huella_archivo(ruta, min(posicion, BYTES_HUELLA)), estado.st_size, estado.st_mtime,
+          datetime.now().strftime("%Y-%m-%d %H:%M:%S"), sesiones_anteriores + sesiones))
+    return sesiones
+
+# Función que recalcula el próximo cambio de los componentes medidos por uso a partir de los contadores
+def actualizar_vida_util(cursor, reglas, ids_clientes):
+    """Actualiza las fechas de próximo cambio de pezoneras y pulsadores según los ordeñes acumulados"""
+    hoy = datetime.now()
+    for inicio in range(0, len(ids_clientes), 500):
+        lote = ids_clientes[inicio:inicio + 500]
+        cursor.execute(f"""
+            SELECT c.id, c.vacas, c.ordenes, c.bajadas, u.ultima_sesion, u.ordenes_pezoneras, u.ordenes_pulsadores
+            FROM clientes c JOIN uso_ordenie u ON u.id_cliente = c.id
+            WHERE c.id IN ({', '.join('?' * len(lote))})
+        """, lote)
+        cambios = []
+        for id_cliente, vacas, ordenes, bajadas, ultima_sesion, *contadores in cursor.fetchall():
+            # Los contadores llegan hasta la última sesión importada: la vida restante se cuenta desde ese día.
+            desde = leer_fecha(ultima_sesion) or hoy
+            fechas = []
+            for componente, usados in zip(COMPONENTES_POR_USO, contadores):
+                restante = vida_restante(reglas, componente, id_cliente, usados, bajadas)
+                dias = reglas.dias(componente, id_cliente, vacas, ordenes, bajadas)
+                if restante is None or dias is None:
+                    fechas.append(None)
+                    continue
+                # Días restantes = ordeñes por unidad que quedan / ordeñes por unidad y por día.
+                tasa = vacas * (ordenes / bajadas)
+                fechas.append((desde + timedelta(days=int(restante / tasa))).strftime("%Y-%m-%d"))
+            cambios.append((*fechas, id_cliente))
+        cursor.executemany("""
+            UPDATE clientes
+            SET proximo_cambio_pezoneras = IFNULL(?, proximo_cambio_pezoneras),
+                proximo_cambio_pulsadores = IFNULL(?, proximo_cambio_pulsadores),
+                version = version + 1
+            WHERE id = ?
+        """, cambios)
+
+# Función que calcula cuántos ordeñes por unidad le quedan a un componente
+def vida_restante(reglas, componente, id_cliente, usados, bajadas):
+    """Devuelve los ordeñes por unidad restantes o None si la regla del componente no es por uso"""
+    tipo, parametros = reglas.regla(componente, id_cliente)
+    if tipo != "uso" or not bajadas or bajadas <= 0:
+        return None
+    return max(json.loads(parametros)["constante"] - (usados or 0) / bajadas, 0)
+
+# Hilo que importa las exportaciones de la carpeta sin bloquear la interfaz
+class HiloIngestaOrdenie(QThread):
+    terminado = pyqtSignal(int, int, int, list)  # (archivos importados, sesiones leídas, archivos sin terminar, errores)
+    fallo = pyqtSignal(str)
+
+    def __init__(self, reglas, parent=None):
+        """Inicializa el hilo con las reglas de intervalo vigentes"""
+        super().__init__(parent)
+        self.reglas = reglas
+
+    def run(self):
+        """Importa en orden los archivos nuevos de la carpeta de exportaciones"""
+        archivos = 0
+        sesiones = 0
+        pendientes = 0
+        errores = []
+        try:
+            nombres = sorted(os.listdir(CARPETA_ORDENIE))
+        except OSError as e:
+            self.fallo.emit(str(e))
+            return
+        for nombre in nombres:
+            ruta = os.path.join(CARPETA_ORDENIE, nombre)
+            if not os.path.isfile(ruta) or not nombre.lower().endswith((".csv", ".json", ".jsonl")):
+                continue
+            try:
+                # Un archivo que se está copiando sigue cambiando: se importa cuando queda quieto.
+                if time.time() - os.stat(ruta).st_mtime < ESPERA_ARCHIVO_ESTABLE:
+                    pendientes += 1
+                    continue
+                leidas = importar_archivo_ordenie(ruta, self.reglas)
+            except (ValueError, csv.Error) as e:
+                # Archivo mal formado: se anota para no volver a intentarlo hasta que cambie.
+                errores.append(f"{nombre}: {e}")
+                try:
+                    registrar_error_ordenie(ruta, str(e))
+                except (OSError, sqlite3.Error):
+                    pass
+                continue
+            except (OSError, sqlite3.Error) as e:
+                errores.append(f"{nombre}: {e}")  # Base bloqueada o archivo en uso: se reintenta la próxima vez.
+                continue
+            if leidas is not None:
+                archivos += 1
+                sesiones += leidas
+        self.terminado.emit(archivos, sesiones, pendientes, errores)
+
+# Repuestos que consume cada cambio: componente -> (nombre del repuesto, cantidad por bajada)
+REPUESTOS_POR_CAMBIO = {
+    "pezoneras": ("Pezoneras", 4),
+    "mangueras": ("Juegos de mangueras", 1),
+    "pulsadores": ("Pulsadores", 1),
+}
+DESFASE_JULIANO = 1721424.5  # julianday('0001-01-01') - 1: convierte fechas de SQLite a date.toordinal().
+
+# Función que suma meses de calendario a una fecha
+def sumar_meses(fecha, meses):
+    """Devuelve la fecha `meses` meses después, ajustando el día al último del mes si hace falta"""
+    anio, mes = divmod(fecha.month - 1 + meses, 12)
+    anio += fecha.year
+    mes += 1
+    return fecha.replace(year=anio, month=mes, day=min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+# Función que proyecta los cambios futuros de todos los clientes y los agrupa por semana
+def pronosticar_demanda(reglas, meses):
+    """Devuelve (lunes de cada semana, {componente: [cantidad por semana]}) para los próximos `meses` meses"""
+    hoy = date.today()
+    inicio = hoy.toordinal() - hoy.weekday()  # Lunes de la semana actual.
+    fin = sumar_meses(hoy, meses).toordinal()
+    semanas = [date.fromordinal(lunes) for lunes in range(inicio, fin + 1, 7)]
+    demanda = {componente: [0] * len(semanas) for componente in REPUESTOS_POR_CAMBIO}
+
+    # Las fechas se convierten a ordinales en SQLite para no parsear texto fila por fila.
+    columnas = ", ".join(
+        f"CAST(julianday({ultimo}) - {DESFASE_JULIANO} AS INTEGER), "
+        f"CAST(julianday({proximo}) - {DESFASE_JULIANO} AS INTEGER)"
+        for ultimo, proximo in (COMPONENTES[componente] for componente in REPUESTOS_POR_CAMBIO)
+    )
+    conn = conectar_db()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id, vacas, ordenes, bajadas, {columnas} FROM clientes")
+
+    while True:
+        lote = cursor.fetchmany(1000)
+        if not lote:
+            break
+        for id_cliente, vacas, ordenes, bajadas, *fechas in lote:
+            if not bajadas or bajadas <= 0:
+                continue
+            for indice, (componente, (_, cantidad)) in enumerate(REPUESTOS_POR_CAMBIO.items()):
+                ultimo, proximo = fechas[2 * indice], fechas[2 * indice + 1]
+                intervalo = reglas.dias(componente, id_cliente, vacas, ordenes, bajadas)
+                if proximo is None:
+                    if ultimo is None or intervalo is None:
+                        continue
+                    proximo = ultimo + intervalo
+                proximo = max(proximo, hoy.toordinal())  # Los vencidos se cuentan como a cambiar ya.
+
+                # Cambios en proximo, proximo + intervalo, ... hasta el fin del horizonte.
+                paso = intervalo if intervalo and intervalo > 0 else fin + 1
+                semanas_componente = demanda[componente]
+                for evento in range(proximo, fin + 1, paso):
+                    semanas_componente[(evento - inicio) // 7] += cantidad * bajadas
+    conn.close()
+    return semanas, demanda
+
+# Función que devuelve los próximos cambios que vencen dentro de una cantidad de días
+def consultar_vencimientos(cursor, dias):
+    """Devuelve (id, nombre, componente, fecha) de los cambios vencidos o que vencen en `dias` días, por fecha"""
+    limite = (datetime.now() + timedelta(days=dias)).strftime("%Y-%m-%d")
+    # Cada componente usa su índice; "Sin datos" queda afuera porque es mayor que cualquier fecha.
+    consultas = " UNION ALL ".join(
+        f"SELECT id, nombre, '{componente}', {proximo} FROM clientes WHERE {proximo} <= ?"
+        for componente, (_, proximo) in COMPONENTES.items()
+    )
+    cursor.execute(f"SELECT * FROM ({consultas}) ORDER BY 4, 2", (limite,) * len(COMPONENTES))
+    return cursor.fetchall()
+
+# Función que calcula hasta qué fecha un próximo cambio está vencido o por vencer (mismos cortes que colorear_celda)
+def limites_estado():
+    """Devuelve (última fecha vencida, última fecha por vencer) como YYYY-MM-DD"""
+    hoy = datetime.now()
+    return ((hoy + timedelta(days=1)).strftime("%Y-%m-%d"),  # Días restantes <= 0.
+            (hoy + timedelta(days=UMBRALES_ALERTA[0] + 1)).strftime("%Y-%m-%d"))  # Días restantes <= 15.
+
+# Función que clasifica una fecha de próximo cambio con los límites de limites_estado
+def clasificar_fecha(fecha, limites):
+    """Devuelve "vencido", "por_vencer" o "al_dia" para una fecha YYYY-MM-DD"""
+    limite_vencido, limite_por_vencer = limites
+    if fecha <= limite_vencido:
+        return "vencido"
+    return "por_vencer" if fecha <= limite_por_vencer else "al_dia"
+
+# Función que cuenta los próximos cambios de cada componente según su estado (mismos cortes que colorear_celda)
+def resumen_estado(cursor):
+    """Devuelve ({componente: {"vencido", "por_vencer", "al_dia"}}, total de vacas) en una sola lectura"""
+    limite_vencido, limite_por_vencer = limites_estado()
+    columnas = ", ".join(
+        f"SUM(NULLIF({proximo}, '') <= :vencido), "  # Vacío es "Sin datos", no una fecha vencida.
+        f"SUM({proximo} > :vencido AND {proximo} <= :por_vencer), "
+        f"SUM({proximo} > :por_vencer AND {proximo} < 'A')"  # Solo fechas: deja afuera "Sin datos".
+        for _, proximo in COMPONENTES.values()
+    )
+    cursor.execute(f"SELECT IFNULL(SUM(vacas), 0), {columnas} FROM clientes",
+                   {"vencido": limite_vencido, "por_vencer": limite_por_vencer})
+    total_vacas, *conteos = cursor.fetchone()
+    resumen = {}
+    for indice, componente in enumerate(COMPONENTES):
+        vencido, por_vencer, al_dia = (valor or 0 for valor in conteos[3 * indice:3 * indice + 3])
+        resumen[componente] = {"vencido": vencido, "por_vencer": por_vencer, "al_dia": al_dia}
+    return resumen, total_vacas
+
+# Función que consulta la base de datos de un distribuidor (se ejecuta en un hilo del grupo)
+def consultar_distribuidor(ruta, dias):
+    """Abre la base en solo lectura y devuelve (vencimientos ordenados por fecha, resumen, total de vacas)"""
+    conn = sqlite3.connect(f"file:{os.path.abspath(ruta)}?mode=ro", uri=True, timeout=TIEMPO_ESPERA_DB)
+    try:
+        cursor = conn.cursor()
+        vencimientos = consultar_vencimientos(cursor, dias)
+        resumen, total_vacas = resumen_estado(cursor)
+    finally:
+        conn.close()
+    return vencimientos, resumen, total_vacas
+
+# Función que consulta en paralelo todas las bases de distribuidores de una carpeta y combina los resultados
+def consolidar_distribuidores(carpeta, dias, hilos=None):
+    """Devuelve (resumen por distribuidor, resumen total, vencimientos de todos ordenados por fecha, errores)"""
+    rutas = {os.path.splitext(nombre)[0]: os.path.join(carpeta, nombre)
+             for nombre in sorted(os.listdir(carpeta)) if nombre.lower().endswith(".db")}
+    resumenes = {}
+    total = {componente: {"vencido": 0, "por_vencer": 0, "al_dia": 0} for componente in COMPONENTES}
+    total_vacas = 0
+    listas = []
+    errores = {}
+
+    # SQLite libera el GIL mientras consulta, así que los hilos aprovechan varios núcleos.
+    with ThreadPoolExecutor(max_workers=hilos or min(32, (os.cpu_count() or 1) + 4)) as grupo:
+        futuros = {grupo.submit(consultar_distribuidor, ruta, dias): distribuidor for distribuidor, ruta in rutas.items()}
+        # Los resúmenes se acumulan a medida que termina cada base, sin esperar a las más lentas.
+        for futuro in as_completed(futuros):
+            distribuidor = futuros[futuro]
+            try:
+                vencimientos, resumen, vacas = futuro.result()
+            except sqlite3.Error as e:
+                errores[distribuidor] = str(e)
+                continue
+            resumenes[distribuidor] = (resumen, vacas)
+            total_vacas += vacas
+            for componente, conteos in resumen.items():
+                for estado, cantidad in conteos.items():
+                    total[componente][estado] += cantidad
+            listas.append([(fecha, distribuidor, nombre, componente)
+                           for _, nombre, componente, fecha in vencimientos])
+
+    # Cada lista ya viene ordenada por fecha: se intercalan sin volver a ordenar todo.
+    return resumenes, (total, total_vacas), heapq.merge(*listas), errores
+
+# Función que calcula la distancia en kilómetros entre dos coordenadas
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Calcula la distancia en línea recta (fórmula del haversine) entre dos puntos"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+# Función que ordena las paradas de una ruta con vecino más cercano y mejora 2-opt
+def ordenar_ruta(puntos, limite_segundos=0.8):
+    """Devuelve el orden de visita de `puntos` [(lat, lon), ...] saliendo y volviendo al primero"""
+    n = len(puntos)
+    if n <= 3:
+        return list(range(n))
+
+    # Matriz de distancias precalculada.
+    distancias = [[distancia_km(*puntos[i], *puntos[j]) for j in range(n)] for i in range(n)]
+
+    # Vecino más cercano desde el punto de partida.
+    ruta = [0]
+    pendientes = set(range(1, n))
+    while pendientes:
+        fila = distancias[ruta[-1]]
+        siguiente = min(pendientes, key=fila.__getitem__)
+        ruta.append(siguiente)
+        pendientes.remove(siguiente)
+    ruta.append(0)  # Vuelta al punto de partida.
+
+    # 2-opt: invierte tramos mientras acorten la ruta o hasta agotar el tiempo.
+    vencimiento = time.perf_counter() + limite_segundos
+    mejorado = True
+    while mejorado and time.perf_counter() < vencimiento:
+        mejorado = False
+        for i in range(1, n - 1):
+            a, b = ruta[i - 1], ruta[i]
+            fila_a, fila_b = distancias[a], distancias[b]
+            d_ab = fila_a[b]
+            for j in range(i + 1, n):
+                c, d = ruta[j], ruta[j + 1]
+                if fila_a[c] + fila_b[d] < d_ab + distancias[c][d] - 1e-9:
+                    ruta[i:j + 1] = reversed(ruta[i:j + 1])
+                    mejorado = True
+                    b = ruta[i]
+                    fila_b = distancias[b]
+                    d_ab = fila_a[b]
+    return ruta[:-1]
+
+# Columnas de la tabla de clientes que se muestran en la ventana principal
+COLUMNAS_TABLA = """
+    id, nombre, vacas, ultimo_cambio, intervalo, ultimo_cambio_pezoneras,
+    proximo_cambio_pezoneras, proximo_cambio_mangueras, ordenes, bajadas,
+    ultimo_cambio_pulsadores, proximo_cambio_pulsadores,
+    ultimo_chequeo, proximo_chequeo, version
+"""
+TAMANO_PAGINA = 200  # Clientes leídos de la base cada vez que la tabla llega a un borde.
+PAGINAS_EN_MEMORIA = 5  # Al pasar este límite se descartan las páginas del otro extremo.
+CAMPOS_CLIENTE = tuple(columna.strip() for columna in COLUMNAS_TABLA.split(","))
+CAMPOS_FECHA = {campo for campo in CAMPOS_CLIENTE if campo.startswith(("ultimo_", "proximo_"))}
+
+# Función que convierte una fecha de la base de datos (muchos clientes comparten la misma: se reutiliza el objeto)
+@lru_cache(maxsize=4096)
+def leer_fecha(texto):
+    """Devuelve la fecha como datetime o None si es "Sin datos" o no es válida"""
+    try:
+        return datetime.strptime(texto, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+# Función que convierte una fecha a como se guarda y se muestra
+def escribir_fecha(fecha):
+    """Devuelve la fecha como YYYY-MM-DD o "Sin datos" si es None"""
+    return fecha.strftime("%Y-%m-%d") if fecha is not None else "Sin datos"
+
+# Clase con los datos de un cliente ya convertidos (sin __dict__: ocupa poco aunque haya miles)
+class Cliente:
+    __slots__ = CAMPOS_CLIENTE + ("uso_pezoneras", "uso_pulsadores")
+
+    def __init__(self, fila, uso):
+        """Convierte una fila de COLUMNAS_TABLA y los ordeñes importados (None si no hay)"""
+        for campo, valor in zip(CAMPOS_CLIENTE, fila):
+            if campo in CAMPOS_FECHA:
+                valor = leer_fecha(valor)
+            elif campo != "nombre":
+                valor = int(valor or 0)
+            setattr(self, campo, valor)
+        self.uso_pezoneras, self.uso_pulsadores = uso if uso is not None else (None, None)
+
+    def como_fila(self):
+        """Devuelve la fila de COLUMNAS_TABLA y los ordeñes importados, como se reciben en __init__"""
+        fila = [escribir_fecha(getattr(self, campo)) if campo in CAMPOS_FECHA else getattr(self, campo)
+                for campo in CAMPOS_CLIENTE]
+        uso = [self.uso_pezoneras, self.uso_pulsadores] if self.uso_pezoneras is not None else None
+        return fila, uso
+
+# Clase que guarda en memoria los clientes activos: la tabla se dibuja a partir de aquí
+class AlmacenClientes:
+    def __init__(self):
+        """Inicializa el almacén vacío"""
+        self.clientes = {}  # id_cliente -> Cliente (solo los de las páginas cargadas)
+
+    def leer(self, cursor, condicion="", parametros=(), descendente=False, limite=-1):
+        """Lee los clientes que cumplen la condición junto con sus ordeñes importados"""
+        orden = "DESC" if descendente else "ASC"
+        cursor.execute(f"""
+            SELECT {COLUMNAS_TABLA}, u.id_cliente, u.ordenes_pezoneras, u.ordenes_pulsadores
+            FROM clientes LEFT JOIN uso_ordenie u ON u.id_cliente = clientes.id
+            {condicion} ORDER BY nombre COLLATE NOCASE {orden}, clientes.id {orden} LIMIT ?
+        """, (*parametros, limite))
+        return [Cliente(fila[:-3], fila[-2:] if fila[-3] is not None else None) for fila in cursor.fetchall()]
+
+    def pagina(self, cursor, clave=None, hacia_atras=False, incluir_clave=False, limite=TAMANO_PAGINA):
+        """Lee los clientes que siguen (o preceden) a la clave (nombre, id), los agrega y los devuelve en orden"""
+        condicion, parametros = "", ()
+        if clave is not None:
+            # Búsqueda por clave sobre idx_clientes_nombre: cuesta lo mismo en cualquier página, sin OFFSET.
+            mayor, menor = ("<", "<=") if hacia_atras else (">", ">=")
+            igual = "=" if incluir_clave else ""
+            condicion = (f"WHERE nombre {menor} ? COLLATE NOCASE "
+                         f"AND (nombre {mayor} ? COLLATE NOCASE OR clientes.id {mayor}{igual} ?)")
+            parametros = (clave[0], clave[0], clave[1])
+        clientes = self.leer(cursor, condicion, parametros, hacia_atras, limite)
+        if hacia_atras:
+            clientes.reverse()
+        self.clientes.update((cliente.id, cliente) for cliente in clientes)
+        return clientes
+
+    def versiones_en_rango(self, cursor, primera=None, ultima=None):
+        """Devuelve {id: versión} de los clientes de la base entre dos claves (None = sin límite)"""
+        condiciones, parametros = [], []
+        if primera is not None:
+            condiciones.append("nombre >= ? COLLATE NOCASE AND (nombre > ? COLLATE NOCASE OR id >= ?)")
+            parametros += [primera[0], primera[0], primera[1]]
+        if ultima is not None:
+            condiciones.append("nombre <= ? COLLATE NOCASE AND (nombre < ? COLLATE NOCASE OR id <= ?)")
+            parametros += [ultima[0], ultima[0], ultima[1]]
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        cursor.execute(f"SELECT id, version FROM clientes {donde}", parametros)
+        return dict(cursor.fetchall())
+
+    def actualizar(self, cursor, ids_clientes):
+        """Vuelve a leer los clientes indicados que estén cargados y devuelve los que siguen existiendo"""
+        ids_clientes = [id_cliente for id_cliente in ids_clientes if id_cliente in self.clientes]
+        actualizados = []
+        for inicio in range(0, len(ids_clientes), 500):
+            lote = ids_clientes[inicio:inicio + 500]
+            actualizados += self.leer(cursor, f"WHERE clientes.id IN ({', '.join('?' * len(lote))})", lote)
+        for id_cliente in ids_clientes:
+            self.clientes.pop(id_cliente, None)
+        self.clientes.update((cliente.id, cliente) for cliente in actualizados)
+        return actualizados
+
+    def clave(self, id_cliente):
+        """Devuelve la clave de orden (nombre, id) de un cliente cargado"""
+        return self.clientes[id_cliente].nombre, id_cliente
+
+    def version(self, id_cliente):
+        """Devuelve la versión del cliente en memoria (None si no está cargado)"""
+        cliente = self.clientes.get(id_cliente)
+        return cliente.version if cliente is not None else None
+
+# Copia de la primera página de la tabla para mostrarla apenas se abre la aplicación
+RUTA_INSTANTANEA = "tabla_inicial.json"
+
+# Función que identifica el estado del archivo de la base de datos
+def clave_base(ruta=RUTA_DB):
+    """Devuelve el contador de cambios de la cabecera de la base: SQLite lo aumenta en cada escritura confirmada"""
+    # `PRAGMA data_version` solo vale dentro de una misma conexión, y la fecha de modificación del archivo puede
+    # tener resolución de segundos: dos escrituras seguidas dejarían la misma. El contador son los bytes 24 a 27.
+    with open(ruta, "rb") as archivo:
+        archivo.seek(24)
+        return int.from_bytes(archivo.read(4), "big")
+
+# Función que guarda la primera página de clientes para el próximo inicio
+def guardar_instantanea(clientes, hay_siguientes, clave):
+    """Escribe las filas ya leídas junto con la clave de la base (clave_base) con que se leyeron"""
+    instantanea = {
+        "formato": 1,
+        "base": os.path.abspath(RUTA_DB),
+        "clave": clave,
+        "hay_siguientes": hay_siguientes,
+        "clientes": [cliente.como_fila() for cliente in clientes],
+    }
+    with open(RUTA_INSTANTANEA + ".tmp", "w", encoding="utf-8") as archivo:
+        json.dump(instantanea, archivo, separators=(",", ":"))
+    os.replace(RUTA_INSTANTANEA + ".tmp", RUTA_INSTANTANEA)
+
+# Función que lee la primera página guardada en el último cierre
+def leer_instantanea():
+    """Devuelve (clientes, hay_siguientes, vigente) o None si no hay una copia utilizable"""
+    try:
+        with open(RUTA_INSTANTANEA, encoding="utf-8") as archivo:
+            instantanea = json.load(archivo)
+        if instantanea.get("formato") != 1 or instantanea.get("base") != os.path.abspath(RUTA_DB):
+            return None
+        clientes = [Cliente(fila, uso) for fila, uso in instantanea["clientes"]]
+        vigente = instantanea["clave"] == clave_base()
+    except (OSError, ValueError, KeyError, TypeError):
+        return None  # Copia ausente, de otra versión o dañada: se carga desde la base como siempre.
+    return clientes, instantanea["hay_siguientes"], vigente
+
+# Componentes vigilados por el programador de alertas (columna de la base de datos -> nombre visible)
+COMPONENTES_ALERTA = {
+    "proximo_cambio_pezoneras": "Cambio de pezoneras",
+    "proximo_cambio_mangueras": "Cambio de mangueras",
+    "proximo_cambio_pulsadores": "Cambio de pulsadores",
+    "proximo_chequeo": "Chequeo",
+}
+UMBRALES_ALERTA = (15, 0)  # Días restantes en los que se avisa (naranja y rojo en la tabla).
+ESPERA_MAXIMA_ALERTAS_MS = 24 * 60 * 60 * 1000  # QTimer no admite intervalos de más de ~24 días.
+INTERVALO_RESUMEN_MS = 60 * 60 * 1000  # Cada cuánto se redibuja el panel de resumen (los estados cambian con el día).
+
+# Clase que programa los avisos de vencimiento sin recorrer la tabla periódicamente
+class ProgramadorAlertas:
+    def __init__(self, parent):
+        """Inicializa el montículo de eventos y el temporizador que despierta en el próximo umbral"""
+        self.parent = parent
+        self.eventos = []  # Montículo de (instante, id_cliente, columna, umbral, versión).
+        self.versiones = {}  # (id_cliente, columna) -> versión vigente; las entradas viejas se descartan al salir.
+        self.nombres = {}  # id_cliente -> nombre, para el texto de la notificación.
+        self.pendientes = {}  # (id_cliente, columna) -> cantidad de eventos vigentes en el montículo.
+        self.descartados = 0  # Entradas invalidadas que todavía ocupan lugar en el montículo.
+
+        # Temporizador de un solo disparo: se rearma siempre con el evento más próximo.
+        self.timer = QTimer(parent)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.disparar)
+
+        # Icono en la bandeja del sistema para mostrar notificaciones de escritorio.
+        self.tray = None
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            icono = parent.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxWarning)
+            self.tray = QSystemTrayIcon(icono, parent)
+            self.tray.setToolTip("Gestión de Pezoneras")
+            self.tray.show()
+
+    def cargar(self):
+        """Construye el montículo con los próximos vencimientos de todos los clientes"""
+        self.eventos = []
+        self.versiones = {}
+        self.nombres = {}
+        self.pendientes = {}
+        self.descartados = 0
+        conn = conectar_db()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, nombre, {', '.join(COMPONENTES_ALERTA)} FROM clientes")
+        clientes = cursor.fetchall()
+        conn.close()
+
+        ahora = datetime.now()
+        for cliente in clientes:
+            self.eventos.extend(self.programar_cliente(cliente, ahora))
+        heapq.heapify(self.eventos)
+        self.rearmar()
+
+    def actualizar_cliente(self, id_cliente):
+        """Reprograma solo los eventos de un cliente después de un `marcar_*`, `modify_*` o alta"""
+        conn = conectar_db()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, nombre, {', '.join(COMPONENTES_ALERTA)} FROM clientes WHERE id = ?", (id_cliente,))
+        cliente = cursor.fetchone()
+        conn.close()
+
+        if cliente is None:
+            self.eliminar_cliente(id_cliente)
+            return
+
+        for evento in self.programar_cliente(cliente, datetime.now()):
+            heapq.heappush(self.eventos, evento)
+        self.compactar()
+        self.rearmar()
+
+    def eliminar_cliente(self, id_cliente):
+        """Invalida los eventos pendientes de un cliente eliminado"""
+        for columna in COMPONENTES_ALERTA:
+            self.invalidar((id_cliente, columna))
+        self.nombres.pop(id_cliente, None)
+        self.compactar()
+        self.rearmar()
+
+    def programar_cliente(self, cliente, ahora):
+        """Genera los eventos futuros de un cliente e invalida los que tenía programados"""
+        id_cliente, nombre = cliente[0], cliente[1]
+        self.nombres[id_cliente] = nombre
+        nuevos = []
+        for columna, fecha in zip(COMPONENTES_ALERTA, cliente[2:]):
+            clave = (id_cliente, columna)
+            version = self.invalidar(clave)
+
+            if not fecha or fecha == "Sin datos":
+                continue
+            try:
+                vencimiento = datetime.strptime(fecha, "%Y-%m-%d")
+            except ValueError:
+                continue
+
+            for umbral in UMBRALES_ALERTA:
+                # Igual que colorear_celda: la celda cambia cuando (vencimiento - ahora).days llega al umbral.
+                instante = vencimiento - timedelta(days=umbral + 1)
+                if instante > ahora:
+                    nuevos.append((instante, id_cliente, columna, umbral, version))
+                    self.pendientes[clave] = self.pendientes.get(clave, 0) + 1
+
+        return nuevos
+
+    def invalidar(self, clave):
+        """Descarta los eventos programados de un (cliente, componente) y devuelve la nueva versión"""
+        self.descartados += self.pendientes.pop(clave, 0)
+        version = self.versiones.get(clave, 0) + 1
+        self.versiones[clave] = version
+        return version
+
+    def es_vigente(self, evento):
+        """Indica si un evento del montículo corresponde a la última programación del cliente"""
+        _, id_cliente, columna, _, version = evento
+        return self.versiones.get((id_cliente, columna)) == version
+
+    def compactar(self):
+        """Reconstruye el montículo cuando las entradas descartadas superan a las vigentes"""
+        if self.descartados > len(self.eventos) // 2 + 64:
+            self.eventos = [evento for evento in self.eventos if self.es_vigente(evento)]
+            heapq.heapify(self.eventos)
+            self.descartados = 0
+
+    def rearmar(self):
+        """Duerme el temporizador hasta el evento vigente más próximo"""
+        while self.eventos and not self.es_vigente(self.eventos[0]):
+            self.sacar()
+
+        self.timer.stop()
+        if not self.eventos:
+            return
+
+        espera = (self.eventos[0][0] - datetime.now()).total_seconds() * 1000
+        self.timer.start(int(min(max(espera, 0), ESPERA_MAXIMA_ALERTAS_MS)))
+
+    def disparar(self):
+        """Notifica los eventos cuyo umbral ya fue alcanzado y vuelve a dormir"""
+        ahora = datetime.now()
+        while self.eventos and self.eventos[0][0] <= ahora:
+            evento = self.sacar()
+            if self.es_vigente(evento):
+                self.notificar(evento)
+        self.rearmar()
+
+    def sacar(self):
+        """Extrae el evento más próximo del montículo y actualiza los contadores"""
+        evento = heapq.heappop(self.eventos)
+        clave = (evento[1], evento[2])
+        if self.es_vigente(evento):
+            self.pendientes[clave] -= 1
+            if not self.pendientes[clave]:
+                del self.pendientes[clave]
+        else:
+            self.descartados -= 1
+        return evento
+
+    def notificar(self, evento):
+        """Muestra una notificación de escritorio para un evento de vencimiento"""
+        _, id_cliente, columna, umbral, _ = evento
+        nombre = self.nombres.get(id_cliente, "")
+        if umbral == 0:
+            mensaje = f"{COMPONENTES_ALERTA[columna]} de '{nombre}' está vencido."
+        else:
+            mensaje = f"{COMPONENTES_ALERTA[columna]} de '{nombre}' vence en {umbral} días."
+
+        if self.tray is not None:
+            self.tray.showMessage("Aviso de mantenimiento", mensaje, QSystemTrayIcon.MessageIcon.Warning)
+        else:
+            QMessageBox.warning(self.parent, "Aviso de mantenimiento", mensaje)
+
+# Clase que mantiene en memoria los contadores del panel de resumen
+class ResumenEstado:
+    def __init__(self):
+        """Inicializa los contadores vacíos"""
+        self.fechas = {componente: {} for componente in COMPONENTES}  # componente -> {fecha: cantidad}
+        self.conteos = {componente: {"vencido": 0, "por_vencer": 0, "al_dia": 0} for componente in COMPONENTES}
+        self.total_vacas = 0
+        self.limites = None
+
+    def cargar(self, cursor):
+        """Lee las tablas de resumen (una fila por fecha distinta, no por cliente)"""
+        self.fechas = {componente: {} for componente in COMPONENTES}
+        cursor.execute("SELECT componente, fecha, cantidad FROM resumen_fechas")
+        for componente, fecha, cantidad in cursor.fetchall():
+            if componente in self.fechas:
+                self.fechas[componente][fecha] = cantidad
+        cursor.execute("SELECT valor FROM resumen_totales WHERE clave = 'vacas'")
+        fila = cursor.fetchone()
+        self.total_vacas = fila[0] if fila else 0
+        self.reclasificar()
+
+    def reclasificar(self):
+        """Vuelve a repartir las fechas en estados con los límites de hoy"""
+        self.limites = limites_estado()
+        for componente, fechas in self.fechas.items():
+            conteos = {"vencido": 0, "por_vencer": 0, "al_dia": 0}
+            for fecha, cantidad in fechas.items():
+                conteos[self.estado(fecha)] += cantidad
+            self.conteos[componente] = conteos
+
+    def estado(self, fecha):
+        """Devuelve el estado de una fecha de próximo cambio"""
+        return clasificar_fecha(fecha, self.limites)
+
+    def sumar(self, componente, fecha, cantidad):
+        """Suma (o resta) clientes con una fecha de próximo cambio"""
+        if not isinstance(fecha, str) or fecha == "" or not fecha < "A":
+            return  # "Sin datos" o vacío: no cuenta en ningún estado.
+        fechas = self.fechas[componente]
+        fechas[fecha] = fechas.get(fecha, 0) + cantidad
+        if fechas[fecha] <= 0:
+            del fechas[fecha]
+        self.conteos[componente][self.estado(fecha)] += cantidad
+
+    def aplicar(self, antes, despues):
+        """Actualiza los contadores con el estado de un cliente antes y después de escribirlo (None = no existe)"""
+        if self.limites != limites_estado():
+            self.reclasificar()
+        for estado_cliente, signo in ((antes, -1), (despues, 1)):
+            if estado_cliente is None:
+                continue
+            vacas, proximos = estado_cliente
+            self.total_vacas += signo * vacas
+            for componente, fecha in proximos.items():
+                self.sumar(componente, fecha, signo)
+
+    def vigentes(self):
+        """Devuelve (conteos por componente y estado, total de vacas) reclasificando si cambió el día"""
+        if self.limites != limites_estado():
+            self.reclasificar()
+        return self.conteos, self.total_vacas
+
+# Servicio local de consultas en JSON (solo lectura) para el tablero del taller y la facturación
+PUERTO_API = 8766
+DIRECCION_API = "127.0.0.1"  # Solo esta computadora; con "" atiende a toda la red local.
+CONEXIONES_API = 4  # Conexiones de solo lectura abiertas: consultas a la base al mismo tiempo.
+LIMITE_API = 100  # Elementos por página si el pedido no indica `limite`.
+LIMITE_MAXIMO_API = 1000
+RESPUESTAS_EN_CACHE_API = 256  # Respuestas recientes que se reutilizan mientras la base no cambie.
+ESPERA_INACTIVA_API = 15  # Segundos que se mantiene abierta una conexión HTTP sin pedidos.
+ESTADOS_HTTP = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 503: "Service Unavailable"}
+
+# Función que codifica la posición de la última fila devuelta para pedir la página siguiente
+def codificar_marca(valores):
+    """Devuelve la marca como texto apto para una URL"""
+    return base64.urlsafe_b64encode(json.dumps(valores, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+# Función que recupera la posición guardada en una marca de paginación
+def decodificar_marca(texto, cantidad):
+    """Devuelve la lista de valores de la marca (None si no hay marca)"""
+    if not texto:
+        return None
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(texto.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Marca de paginación inválida")
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise ValueError("Marca de paginación inválida")
+    return valores
+
+# Función que lee el tamaño de página pedido
+def leer_limite(parametros):
+    """Devuelve el `limite` del pedido entre 1 y LIMITE_MAXIMO_API"""
+    try:
+        limite = int(parametros.get("limite", LIMITE_API))
+    except ValueError:
+        raise ValueError("`limite` debe ser un número")
+    return max(1, min(limite, LIMITE_MAXIMO_API))
+
+# Función que describe un próximo cambio como lo muestra la tabla
+def datos_vencimiento(fecha, limites, ahora):
+    """Devuelve {"fecha", "dias_restantes", "estado"} (None si no hay fecha)"""
+    if fecha is None:
+        return None
+    texto = escribir_fecha(fecha)
+    return {"fecha": texto, "dias_restantes": (fecha - ahora).days, "estado": clasificar_fecha(texto, limites)}
+
+# Función que convierte un cliente en el objeto JSON del servicio de consultas
+def datos_cliente(cliente, limites, ahora):
+    """Devuelve los campos del cliente (fechas como YYYY-MM-DD o null) y sus próximos cambios"""
+    datos = {campo: (escribir_fecha(valor) if valor is not None else None) if campo in CAMPOS_FECHA else valor
+             for campo, valor in ((campo, getattr(cliente, campo)) for campo in CAMPOS_CLIENTE)}
+    datos["ordenes_pezoneras"] = cliente.uso_pezoneras
+    datos["ordenes_pulsadores"] = cliente.uso_pulsadores
+    datos["proximos"] = {componente: datos_vencimiento(getattr(cliente, proximo), limites, ahora)
+                         for componente, (_, proximo) in COMPONENTES.items()}
+    return datos
+
+# Función que devuelve una página de clientes ordenada por nombre
+def consultar_clientes_api(cursor, despues, limite):
+    """Devuelve {"clientes", "siguiente"}: `siguiente` es la marca de la próxima página o null"""
+    # Se pide uno de más para saber si hay otra página sin contar los clientes.
+    clientes = AlmacenClientes().pagina(cursor, despues, limite=limite + 1)
+    siguiente = None
+    if len(clientes) > limite:
+        clientes = clientes[:limite]
+        siguiente = codificar_marca([clientes[-1].nombre, clientes[-1].id])
+    limites, ahora = limites_estado(), datetime.now()
+    return {"clientes": [datos_cliente(cliente, limites, ahora) for cliente in clientes], "siguiente": siguiente}
+
+# Función que devuelve un cliente activo
+def consultar_cliente_api(cursor, id_cliente):
+    """Devuelve el cliente o lanza LookupError si no existe (o está archivado)"""
+    clientes = AlmacenClientes().leer(cursor, "WHERE clientes.id = ?", (id_cliente,))
+    if not clientes:
+        raise LookupError(f"No existe el cliente {id_cliente}")
+    return datos_cliente(clientes[0], limites_estado(), datetime.now())
+
+# Función que devuelve los próximos cambios de una ventana de fechas, por fecha
+def consultar_ventana_api(cursor, desde, hasta, componentes, despues, limite):
+    """Devuelve {"vencimientos", "siguiente"} con los cambios entre `desde` y `hasta` (inclusive)"""
+    if despues is not None:
+        desde = max(desde, despues[0])  # Cada subconsulta empieza en la fecha de la marca usando su índice.
+    consultas = " UNION ALL ".join(
+        f"SELECT {proximo} AS fecha, nombre, id, '{componente}' AS componente FROM clientes "
+        f"WHERE {proximo} >= :desde AND {proximo} <= :hasta"
+        for componente, (_, proximo) in COMPONENTES.items() if componente in componentes
+    )
+    condicion = "WHERE (fecha, nombre, id, componente) > (:fecha, :nombre, :id, :componente)" if despues else ""
+    fecha, nombre, id_cliente, componente = despues or (None,) * 4
+    cursor.execute(f"SELECT * FROM ({consultas}) {condicion} ORDER BY fecha, nombre, id, componente LIMIT :limite",
+                   {"desde": desde, "hasta": hasta, "fecha": fecha, "nombre": nombre, "id": id_cliente,
+                    "componente": componente, "limite": limite + 1})
+    filas = cursor.fetchall()
+    siguiente = codificar_marca(list(filas[limite - 1])) if len(filas) > limite else None
+    limites, ahora = limites_estado(), datetime.now()
+    vencimientos = []
+    for fecha, nombre, id_cliente, componente in filas[:limite]:
+        vencimiento = datos_vencimiento(leer_fecha(fecha), limites, ahora)
+        if vencimiento is not None:
+            vencimientos.append({"id": id_cliente, "nombre": nombre, "componente": componente, **vencimiento})
+    return {"vencimientos": vencimientos, "siguiente": siguiente}
+
+# Función que devuelve los contadores del panel de resumen
+def consultar_resumen_api(cursor):
+    """Devuelve {"componentes": {componente: conteos por estado}, "vacas"} desde las tablas de resumen"""
+    resumen = ResumenEstado()
+    resumen.cargar(cursor)
+    conteos, total_vacas = resumen.vigentes()
+    return {"componentes": conteos, "vacas": total_vacas}
+
+# Clase con las conexiones de solo lectura del servicio de consultas, reutilizadas entre pedidos
+class GrupoConexiones:
+    def __init__(self, ruta=RUTA_DB, tamano=CONEXIONES_API):
+        """Abre las conexiones y los hilos que las usan (uno por conexión)"""
+        self.libres = queue.SimpleQueue()
+        for _ in range(tamano):
+            # Solo lectura: el servicio no puede modificar la base. Sin WAL cada consulta toma un bloqueo compartido
+            # y una escritura de la ventana o de la sincronización espera a que termine (hasta TIEMPO_ESPERA_DB).
+            self.libres.put(sqlite3.connect(f"file:{os.path.abspath(ruta)}?mode=ro", uri=True,
+                                            timeout=TIEMPO_ESPERA_DB, check_same_thread=False))
+        self.tamano = tamano
+        self.hilos = ThreadPoolExecutor(max_workers=tamano)
+
+    def ejecutar(self, consulta, argumentos):
+        """Ejecuta `consulta(cursor, *argumentos)` con una conexión libre y devuelve el resultado como JSON"""
+        conn = self.libres.get()
+        try:
+            resultado = consulta(conn.cursor(), *argumentos)
+        finally:
+            self.libres.put(conn)
+        # También se codifica en el hilo del grupo: el hilo del servicio solo atiende conexiones.
+        return json.dumps(resultado, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def cerrar(self):
+        """Espera las consultas en curso y cierra las conexiones"""
+        self.hilos.shutdown(wait=True)
+        for _ in range(self.tamano):
+            self.libres.get().close()
+
+# Clase que atiende los pedidos HTTP del servicio de consultas con asyncio
+class ServidorApi:
+    def __init__(self, ruta=RUTA_DB, conexiones=CONEXIONES_API):
+        """Prepara el grupo de conexiones y la memoria de respuestas"""
+        self.ruta = ruta
+        self.conexiones = GrupoConexiones(ruta, conexiones)
+        self.respuestas = {}  # destino -> (etag, cuerpo), en orden de uso
+
+    def etag(self):
+        """Devuelve la etiqueta de los datos actuales: cambia con cada escritura confirmada y con el día"""
+        # Solo lee el contador de cambios de la cabecera; el día cuenta porque los estados y días restantes cambian con él.
+        return f'"{clave_base(self.ruta):x}-{date.today():%Y%m%d}"'
+
+    def consulta(self, partes, parametros):
+        """Devuelve (consulta, argumentos) del pedido o lanza LookupError / ValueError"""
+        if partes == ["clientes"]:
+            return consultar_clientes_api, (decodificar_marca(parametros.get("despues"), 2), leer_limite(parametros))
+        if len(partes) == 2 and partes[0] == "clientes":
+            if not partes[1].isdigit():
+                raise LookupError(f"No existe el cliente {partes[1]}")
+            return consultar_cliente_api, (int(partes[1]),)
+        if partes == ["vencimientos"]:
+            desde = parametros.get("desde", "")
+            if "hasta" in parametros:
+                hasta = parametros["hasta"]
+            else:
+                try:
+                    dias = int(parametros.get("dias", UMBRALES_ALERTA[0]))
+                except ValueError:
+                    raise ValueError("`dias` debe ser un número")
+                hasta = (datetime.now() + timedelta(days=dias)).strftime("%Y-%m-%d")
+            for fecha in (desde, hasta):
+                if fecha and leer_fecha(fecha) is None:
+                    raise ValueError(f"Fecha inválida: {fecha} (se espera AAAA-MM-DD)")
+            componentes = parametros.get("componente", ",".join(COMPONENTES)).split(",")
+            desconocidos = set(componentes) - set(COMPONENTES)
+            if desconocidos:
+                raise ValueError(f"Componente desconocido: {', '.join(sorted(desconocidos))}")
+            return consultar_ventana_api, (desde, hasta, set(componentes),
+                                           decodificar_marca(parametros.get("despues"), 4), leer_limite(parametros))
+        if partes == ["resumen"]:
+            return consultar_resumen_api, ()
+        raise LookupError(f"No existe la ruta /{'/'.join(partes)}")
+
+    async def responder(self, metodo, destino, encabezados):
+        """Devuelve (código, encabezados extra, cuerpo) del pedido"""
+        if metodo not in ("GET", "HEAD"):
+            return 405, {"Allow": "GET, HEAD"}, b""
+        try:
+            etag = self.etag()
+        except OSError as e:
+            return 503, {}, json.dumps({"error": str(e)}).encode("utf-8")
+        # El tablero pregunta seguido: si nada cambió no se toca la base.
+        if etag in (valor.strip() for valor in encabezados.get("if-none-match", "").split(",")):
+            return 304, {"ETag": etag}, b""
+        guardada = self.respuestas.pop(destino, None)
+        if guardada is not None and guardada[0] == etag:
+            self.respuestas[destino] = guardada
+            return 200, {"ETag": etag}, guardada[1]
+
+        url = urlsplit(destino)
+        try:
+            consulta, argumentos = self.consulta([parte for parte in url.path.split("/") if parte],
+                                                 dict(parse_qsl(url.query)))
+            cuerpo = await asyncio.get_running_loop().run_in_executor(
+                self.conexiones.hilos, self.conexiones.ejecutar, consulta, argumentos)
+        except LookupError as e:
+            return 404, {}, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+        except ValueError as e:
+            return 400, {}, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+        except sqlite3.Error as e:
+            return 503, {}, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+
+        self.respuestas[destino] = (etag, cuerpo)
+        if len(self.respuestas) > RESPUESTAS_EN_CACHE_API:
+            del self.respuestas[next(iter(self.respuestas))]  # La usada hace más tiempo.
+        return 200, {"ETag": etag}, cuerpo
+
+    async def atender(self, lector, escritor):
+        """Atiende los pedidos de una conexión (HTTP/1.1 la mantiene abierta entre pedidos)"""
+        try:
+            while True:
+                try:
+                    linea = await asyncio.wait_for(lector.readline(), ESPERA_INACTIVA_API)
+                except asyncio.TimeoutError:
+                    break
+                if not linea.strip():
+                    break
+                try:
+                    metodo, destino, version = linea.decode("latin-1").split()
+                except ValueError:
+                    break
+                encabezados = {}
+                while True:
+                    linea = await lector.readline()
+                    if not linea.strip():
+                        break
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                if encabezados.get("content-length", "0").isdigit():
+                    await lector.readexactly(int(encabezados.get("content-length", "0")))  # Se descarta.
+
+                codigo, extra, cuerpo = await self.responder(metodo, destino, encabezados)
+                mantener = version == "HTTP/1.1" and encabezados.get("connection", "").lower() != "close"
+                cabecera = [f"HTTP/1.1 {codigo} {ESTADOS_HTTP[codigo]}",
+                            "Content-Type: application/json; charset=utf-8",
+                            f"Content-Length: {len(cuerpo) if codigo != 304 else 0}",
+                            "Cache-Control: no-cache",  # Se puede guardar, pero preguntando siempre con el ETag.
+                            f"Connection: {'keep-alive' if mantener else 'close'}"]
+                cabecera += [f"{nombre}: {valor}" for nombre, valor in extra.items()]
+                escritor.write(("\r\n".join(cabecera) + "\r\n\r\n").encode("latin-1"))
+                if metodo != "HEAD" and codigo != 304:
+                    escritor.write(cuerpo)
+                await escritor.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def servir(self, direccion, puerto):
+        """Atiende pedidos hasta que se cancele la tarea"""
+        servidor = await asyncio.start_server(self.atender, direccion, puerto)
+        print(f"Servicio de consultas escuchando en http://{direccion or '0.0.0.0'}:{puerto}")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self.conexiones.cerrar()
+
+# Función que inicia el servicio de consultas (bloquea hasta que se interrumpa)
+def servir_api(puerto=PUERTO_API, direccion=DIRECCION_API):
+    """Atiende el servicio de consultas en el puerto indicado"""
+    try:
+        asyncio.run(ServidorApi().servir(direccion, puerto))
+    except KeyboardInterrupt:
+        pass
+
+# Función que inicia el servicio de consultas en un hilo aparte (la ventana sigue con el suyo)
+def iniciar_api(puerto=PUERTO_API, direccion=DIRECCION_API):
+    """Devuelve el hilo del servicio; termina junto con la aplicación"""
+    hilo = threading.Thread(target=servir_api, args=(puerto, direccion), name="servicio-consultas", daemon=True)
+    hilo.start()
+    return hilo
+
 # Clase principal de la aplicación PyQt6
 class ClienteApp(QWidget):
     def __init__(self):
@@ -53,8 +2167,21 @@ class ClienteApp(QWidget):
         self.setWindowTitle("Gestión de Pezoneras")  # Título de la ventana.
         self.showMaximized()  # Abre la ventana en pantalla completa.
         self.setStyle()  # Aplica estilos personalizados.
+        self.reglas = MotorReglas()  # Reglas de intervalo configurables.
+        self.reglas.cargar()
+        self.almacen = AlmacenClientes()  # Clientes en memoria: la tabla se dibuja a partir de aquí.
+        self.resumen = ResumenEstado()  # Contadores del panel de resumen.
         self.initUI()  # Inicializa la interfaz gráfica.
-        self.load_data()  # Carga los datos de la base de datos en la tabla.
+        instantanea_vigente = self.mostrar_instantanea()  # Muestra enseguida la tabla del último cierre.
+        if instantanea_vigente is None:
+            self.load_data()  # Primer inicio: se carga la primera página desde la base de datos.
+            instantanea_vigente = True
+        self.alertas = ProgramadorAlertas(self)  # Avisos de vencimientos próximos.
+        # Lo que lee toda la base se hace después de que la ventana se dibuja por primera vez.
+        QTimer.singleShot(0, lambda: self.completar_inicio(instantanea_vigente))
+        self.iniciar_ingesta_ordenie()  # Vigila la carpeta de exportaciones de la sala de ordeñe.
+        self.iniciar_vigilancia_db()  # Detecta cambios hechos desde otras computadoras.
+        self.iniciar_respaldos()  # Respaldos automáticos en segundo plano.
 
     def setStyle(self):
         """Define el estilo visual de los botones en la aplicación"""
@@ -93,6 +2220,16 @@ class ClienteApp(QWidget):
 
         layout.addLayout(header_layout)
 
+        # Panel de resumen: vencidos, por vencer y al día de cada componente, y total de vacas.
+        resumen_layout = QHBoxLayout()
+        self.resumen_labels = {}
+        for componente in COMPONENTES:
+            self.resumen_labels[componente] = QLabel(self)
+            resumen_layout.addWidget(self.resumen_labels[componente])
+        self.vacas_label = QLabel(self)
+        resumen_layout.addWidget(self.vacas_label)
+        layout.addLayout(resumen_layout)
+
         # Tabla para mostrar los datos de los clientes.
         self.table = QTableWidget()
         self.table.setColumnCount(16)  # Cambiar de 13 a 16 columnas
@@ -104,6 +2241,9 @@ class ClienteApp(QWidget):
             "Fecha de Último Chequeo", "Fecha del Próximo Chequeo", "Marcar Chequeo"
         ])
         self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)  # Deshabilita la edición directa.
+        # Los clientes se leen por páginas al desplazarse (el valor de la barra se mide en filas).
+        self.table.setVerticalScrollMode(QTableWidget.ScrollMode.ScrollPerItem)
+        self.table.verticalScrollBar().valueChanged.connect(self.revisar_desplazamiento)
         layout.addWidget(self.table)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)  # Ajusta el tamaño de las columnas al contenido.
 
@@ -155,6 +2295,51 @@ class ClienteApp(QWidget):
         self.modify_bajadas_button.clicked.connect(self.select_cliente_para_modificar_bajadas)
         layout.addWidget(self.modify_bajadas_button)
 
+        # Botón para configurar las reglas de intervalo de los componentes.
+        self.reglas_button = QPushButton("Configurar Reglas de Intervalo")
+        self.reglas_button.clicked.connect(self.configurar_regla)
+        layout.addWidget(self.reglas_button)
+
+        # Botón para importar las exportaciones de la sala de ordeñe.
+        self.importar_button = QPushButton("Importar Ordeñes")
+        self.importar_button.clicked.connect(self.importar_ordenie)
+        layout.addWidget(self.importar_button)
+
+        # Botón para cargar la ubicación de un cliente.
+        self.ubicacion_button = QPushButton("Ubicación del Cliente")
+        self.ubicacion_button.clicked.connect(self.select_cliente_para_ubicacion)
+        layout.addWidget(self.ubicacion_button)
+
+        # Botón para planificar la ruta de visitas del día.
+        self.ruta_button = QPushButton("Planificar Ruta del Día")
+        self.ruta_button.clicked.connect(self.planificar_ruta)
+        layout.addWidget(self.ruta_button)
+
+        # Botón para ver el pronóstico de repuestos de todos los clientes.
+        self.pronostico_button = QPushButton("Pronóstico de Repuestos")
+        self.pronostico_button.clicked.connect(self.mostrar_pronostico)
+        layout.addWidget(self.pronostico_button)
+
+        # Botón para sincronizar con otras computadoras (archivos o servicio de la oficina).
+        self.sincronizar_button = QPushButton("Sincronizar")
+        self.sincronizar_button.clicked.connect(self.sincronizar)
+        layout.addWidget(self.sincronizar_button)
+
+        # Botón para ver juntos los vencimientos de todas las bases de distribuidores.
+        self.consolidado_button = QPushButton("Modo Consolidado")
+        self.consolidado_button.clicked.connect(self.mostrar_consolidado)
+        layout.addWidget(self.consolidado_button)
+
+        # Botón para hacer o restaurar respaldos de la base de datos.
+        self.respaldos_button = QPushButton("Respaldos")
+        self.respaldos_button.clicked.connect(self.gestionar_respaldos)
+        layout.addWidget(self.respaldos_button)
+
+        # Botón para buscar y restaurar clientes eliminados.
+        self.archivados_button = QPushButton("Clientes Archivados")
+        self.archivados_button.clicked.connect(self.restaurar_archivado)
+        layout.addWidget(self.archivados_button)
+
         # Botón para eliminar un cliente.
         self.delete_button = QPushButton("Eliminar Cliente")
         self.delete_button.clicked.connect(self.delete_cliente)
@@ -248,40 +2433,43 @@ class ClienteApp(QWidget):
             ultima_fecha_cambio_pezoneras = "Sin datos"  # Valor por defecto si no se ingresa nada
 
         # Calcular el Próximo Cambio de Pezoneras (Columna 5)
-        if ultima_fecha_cambio_pezoneras != "Sin datos" and vacas > 0 and ordenes > 0 and bajadas > 0:
-            dias_adicionales = 2500 / (vacas * (ordenes / bajadas))
-            dias_adicionales = int(dias_adicionales)
-            fecha_ultimo_cambio = datetime.strptime(ultima_fecha_cambio_pezoneras, "%Y-%m-%d")
-            proximo_cambio_pezoneras = (fecha_ultimo_cambio + timedelta(days=dias_adicionales)).strftime("%Y-%m-%d")
-        else:
-            proximo_cambio_pezoneras = "Sin datos"
+        proximo_cambio_pezoneras = self.reglas.proxima_fecha("pezoneras", None, ultima_fecha_cambio_pezoneras,
+                                                             vacas, ordenes, bajadas)
 
         # Calcular el Próximo Chequeo (Columna 14)
-        if ultimo_chequeo != "Sin datos" and vacas > 0 and ordenes > 0 and bajadas > 0:
-            dias_adicionales_chequeo = 7000 / (vacas * (ordenes / bajadas))
-            dias_adicionales_chequeo = int(dias_adicionales_chequeo)
-            fecha_ultimo_chequeo = datetime.strptime(ultimo_chequeo, "%Y-%m-%d")
-            proximo_chequeo = (fecha_ultimo_chequeo + timedelta(days=dias_adicionales_chequeo)).strftime("%Y-%m-%d")
-        else:
-            proximo_chequeo = "Sin datos"
+        proximo_chequeo = self.reglas.proxima_fecha("chequeo", None, ultimo_chequeo, vacas, ordenes, bajadas)
+
+        # Calcular el Próximo Cambio de Pulsadores (Columna 11): se guarda para las consultas por fecha
+        proximo_cambio_pulsadores = self.reglas.proxima_fecha("pulsadores", None, ultima_fecha_cambio_pulsadores,
+                                                              vacas, ordenes, bajadas)
 
         # Fecha inicial para la columna 7
         proximo_cambio_mangueras = datetime.now().strftime("%Y-%m-%d")
 
         # Inserta los datos en la base de datos
-        conn = sqlite3.connect("clientes.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO clientes (nombre, vacas, ultimo_cambio, intervalo, ultimo_cambio_pezoneras, 
-                                  proximo_cambio_mangueras, ordenes, bajadas, ultimo_cambio_pulsadores, 
-                                  proximo_cambio_pezoneras, ultimo_chequeo, proximo_chequeo) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (nombre, vacas, fecha_cambio, 0, ultima_fecha_cambio_pezoneras, ultima_fecha_cambio_mangueras, 
-              ordenes, bajadas, ultima_fecha_cambio_pulsadores, proximo_cambio_pezoneras, ultimo_chequeo, proximo_chequeo))
-        conn.commit()
-        conn.close()
+        def insertar(cursor):
+            cursor.execute("""
+                INSERT INTO clientes (nombre, vacas, ultimo_cambio, intervalo, ultimo_cambio_pezoneras, 
+                                      proximo_cambio_mangueras, ordenes, bajadas, ultimo_cambio_pulsadores, 
+                                      proximo_cambio_pulsadores, proximo_cambio_pezoneras, ultimo_chequeo, proximo_chequeo) 
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (nombre, vacas, fecha_cambio, 0, ultima_fecha_cambio_pezoneras, ultima_fecha_cambio_mangueras, 
+                  ordenes, bajadas, ultima_fecha_cambio_pulsadores, proximo_cambio_pulsadores, proximo_cambio_pezoneras,
+                  ultimo_chequeo, proximo_chequeo))
+            return cursor.lastrowid
+
+        try:
+            id_cliente = self.escribir_cliente(None, insertar)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al agregar el cliente: {str(e)}")
+            return
+
+        self.alertas.actualizar_cliente(id_cliente)  # Programa los avisos del nuevo cliente.
 
-        self.load_data()  # Recarga los datos en la tabla.
+        try:
+            self.recargar_ventana()  # Vuelve a leer las filas cargadas sin llevar la tabla a la primera página.
+        except sqlite3.OperationalError:
+            pass  # Base bloqueada: la vigilancia de cambios muestra el alta cuando se libere.
         QMessageBox.information(self, "Éxito", "Cliente agregado correctamente.")
         self.clear_inputs()  # Limpia los campos de entrada.
 
@@ -297,345 +2485,416 @@ class ClienteApp(QWidget):
         self.ultimo_chequeo_input.clear()
         self.ultimo_chequeo_input.clear()
 
-    def load_data(self):
-        """Carga y muestra los datos de los clientes en la tabla"""
+    def load_data(self, clave=None, limite=TAMANO_PAGINA):
+        """Muestra la primera página de clientes (o la que empieza en `clave`) y libera las demás"""
+        # Se lee antes de limpiar: si la base está bloqueada, la tabla queda como estaba.
+        conn = conectar_db()
+        try:
+            # Ordenar los clientes alfabéticamente por nombre
+            almacen = AlmacenClientes()
+            clientes = almacen.pagina(conn.cursor(), clave, incluir_clave=True, limite=limite)
+        finally:
+            conn.close()
         self.table.setRowCount(0)  # Limpia la tabla.
-        conn = sqlite3.connect("clientes.db")
-        cursor = conn.cursor()
-        # Ordenar los clientes alfabéticamente por nombre
-        cursor.execute("""
-            SELECT id, nombre, vacas, ultimo_cambio, intervalo, ultimo_cambio_pezoneras, 
-                   proximo_cambio_pezoneras, proximo_cambio_mangueras, ordenes, bajadas, 
-                   ultimo_cambio_pulsadores, proximo_cambio_pulsadores, 
-                   ultimo_chequeo, proximo_chequeo
-            FROM clientes 
-            ORDER BY nombre ASC
-        """)
-        clientes = cursor.fetchall()
-        conn.close()
+        self.almacen.clientes = almacen.clientes
 
+        self.hay_anteriores = clave is not None
+        self.hay_siguientes = len(clientes) == limite
+        self.table.setRowCount(len(clientes))
         for row_idx, cliente in enumerate(clientes):
-            # Desglosa los valores de cliente
-            (id_cliente, nombre, vacas, ultimo_cambio, intervalo, ultimo_cambio_pezoneras, 
-             proximo_cambio_pezoneras, proximo_cambio_mangueras, ordenes, bajadas, 
-             ultimo_cambio_pulsadores, proximo_cambio_pulsadores, 
-             ultimo_chequeo, proximo_chequeo) = cliente
-
-            # Insertar datos en la tabla
-            self.table.insertRow(row_idx)
-
-            # Columna 0: Nombre del Cliente (asociar el ID del cliente)
-            nombre_item = QTableWidgetItem(nombre)
-            nombre_item.setData(Qt.ItemDataRole.UserRole, id_cliente)  # Asociar el ID del cliente
-            self.table.setItem(row_idx, 0, nombre_item)
-
-            # Columna 1: Vacas
-            self.table.setItem(row_idx, 1, QTableWidgetItem(str(vacas)))
-
-            # Columna 2: Ordeñes
-            ordenes_item = QTableWidgetItem(str(ordenes))
-            ordenes_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 2, ordenes_item)
-
-            # Columna 3: Bajadas
-            bajadas_item = QTableWidgetItem(str(bajadas))
-            bajadas_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 3, bajadas_item)
-
-            # Columna 4: Último Cambio de Pezoneras
-            if ultimo_cambio_pezoneras is None or ultimo_cambio_pezoneras == "Sin datos":
-                ultimo_cambio_pezoneras = "Sin datos"
-            ultimo_cambio_item = QTableWidgetItem(ultimo_cambio_pezoneras)
-            ultimo_cambio_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 4, ultimo_cambio_item)
-
-            # Columna 5: Próximo Cambio de Pezoneras
-            if proximo_cambio_pezoneras is None or proximo_cambio_pezoneras == "Sin datos":
-                proximo_cambio_pezoneras = "Sin datos"
-            proximo_cambio_item = QTableWidgetItem(proximo_cambio_pezoneras)
-            proximo_cambio_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            if proximo_cambio_pezoneras != "Sin datos":
-                dias_restantes = (datetime.strptime(proximo_cambio_pezoneras, "%Y-%m-%d") - datetime.now()).days
-                self.colorear_celda(proximo_cambio_item, dias_restantes)
-            self.table.setItem(row_idx, 5, proximo_cambio_item)
-
-            # Columna 6: Botón para marcar cambio de pezoneras
-            btn_pezoneras = QPushButton("Marcar Cambio")
-            btn_pezoneras.clicked.connect(self.create_marcar_cambio_pezoneras_handler(id_cliente, row_idx))
-            self.table.setCellWidget(row_idx, 6, btn_pezoneras)
-
-            # Columna 7: Último Cambio de Mangueras
-            if ultimo_cambio is None or ultimo_cambio == "Sin datos":
-                ultimo_cambio = "Sin datos"
-            ultimo_cambio_item = QTableWidgetItem(ultimo_cambio)
-            ultimo_cambio_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 7, ultimo_cambio_item)
-
-            # Columna 8: Próximo Cambio de Mangueras
-            if proximo_cambio_mangueras is None or proximo_cambio_mangueras == "Sin datos":
-                proximo_cambio_mangueras = "Sin datos"
-            proximo_cambio_item = QTableWidgetItem(proximo_cambio_mangueras)
-            proximo_cambio_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            if proximo_cambio_mangueras != "Sin datos":
-                dias_restantes = (datetime.strptime(proximo_cambio_mangueras, "%Y-%m-%d") - datetime.now()).days
-                self.colorear_celda(proximo_cambio_item, dias_restantes)
-            self.table.setItem(row_idx, 8, proximo_cambio_item)
-
-            # Columna 9: Botón para marcar cambio de mangueras
-            btn_mangueras = QPushButton("Marcar Cambio de Manguera")
-            btn_mangueras.clicked.connect(self.create_marcar_cambio_mangueras_handler(id_cliente, row_idx))
-            self.table.setCellWidget(row_idx, 9, btn_mangueras)
-
-            # Columna 10: Último Cambio de Pulsador
-            if ultimo_cambio_pulsadores is None:
-                ultimo_cambio_pulsadores = "Sin datos"
-            ultimo_cambio_pulsadores_item = QTableWidgetItem(ultimo_cambio_pulsadores)
-            ultimo_cambio_pulsadores_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 10, ultimo_cambio_pulsadores_item)
-
-            # Columna 11: Próximo Cambio de Pulsador
-            if ultimo_cambio_pulsadores is None or ultimo_cambio_pulsadores == "Sin datos":
-                proximo_cambio_pulsadores_item = QTableWidgetItem("Sin datos")
-            else:
-                try:
-                    vacas_item = self.table.item(row_idx, 1)
-                    vacas = int(vacas_item.text()) if vacas_item else 0
-
-                    ordenes_item = self.table.item(row_idx, 2)
-                    ordenes = int(ordenes_item.text()) if ordenes_item else 0
-
-                    bajadas_item = self.table.item(row_idx, 3)
-                    bajadas = int(bajadas_item.text()) if bajadas_item else 0
-
-                    if vacas > 0 and ordenes > 0 and bajadas > 0:
-                        dias_adicionales = 7000 / (vacas * (ordenes / bajadas))
-                        dias_adicionales = int(dias_adicionales)
-
-                        # Calcular la fecha del próximo cambio usando la fecha de la columna 10
-                        fecha_ultimo_cambio = datetime.strptime(ultimo_cambio_pulsadores, "%Y-%m-%d")
-                        proximo_cambio = fecha_ultimo_cambio + timedelta(days=dias_adicionales)
-                        proximo_cambio_pulsadores_item = QTableWidgetItem(proximo_cambio.strftime("%Y-%m-%d"))
-
-                        # Aplicar color según los días restantes
-                        dias_restantes = (proximo_cambio - datetime.now()).days
-                        self.colorear_celda(proximo_cambio_pulsadores_item, dias_restantes)
-                    else:
-                        proximo_cambio_pulsadores_item = QTableWidgetItem("Sin datos")
-                except Exception:
-                    proximo_cambio_pulsadores_item = QTableWidgetItem("Error")
-
-            self.table.setItem(row_idx, 11, proximo_cambio_pulsadores_item)
-
-            # Columna 12: Botón para marcar cambio de pulsadores
-            btn_pulsadores = QPushButton("Marcar Cambio de Pulsador")
-            btn_pulsadores.clicked.connect(self.create_marcar_cambio_pulsadores_handler(id_cliente, row_idx))
-            self.table.setCellWidget(row_idx, 12, btn_pulsadores)
-
-            # Columna 13: Fecha de Último Chequeo
-            if ultimo_chequeo is None or ultimo_chequeo == "Sin datos":
-                ultimo_chequeo = "Sin datos"
-            ultimo_chequeo_item = QTableWidgetItem(ultimo_chequeo)
-            ultimo_chequeo_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 13, ultimo_chequeo_item)
-
-            # Columna 14: Fecha del Próximo Chequeo
-            if proximo_chequeo is None or proximo_chequeo == "Sin datos":
-                proximo_chequeo = "Sin datos"
-            proximo_chequeo_item = QTableWidgetItem(proximo_chequeo)
-            proximo_chequeo_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            if proximo_chequeo != "Sin datos":
-                dias_restantes = (datetime.strptime(proximo_chequeo, "%Y-%m-%d") - datetime.now()).days
-                self.colorear_celda(proximo_chequeo_item, dias_restantes)
-            self.table.setItem(row_idx, 14, proximo_chequeo_item)
-
-            # Columna 15: Botón para marcar chequeo
-            btn_chequeo = QPushButton("Marcar Chequeo")
-            btn_chequeo.clicked.connect(self.create_marcar_chequeo_handler(id_cliente, row_idx))
-            self.table.setCellWidget(row_idx, 15, btn_chequeo)
-
-        # Forzar el ordenamiento alfabético en la tabla
-        self.table.sortItems(0, Qt.SortOrder.AscendingOrder)
+            self.mostrar_fila(row_idx, cliente)
 
-    def marcar_cambio_pezoneras(self, id_cliente, row_idx):
-        """Marca un cambio de pezoneras para un cliente, actualiza la columna 4 y recalcula la columna 5"""
+    def mostrar_instantanea(self):
+        """Dibuja la primera página guardada al cerrar; devuelve si la base no cambió desde entonces (None = no hay)"""
+        instantanea = leer_instantanea()
+        if instantanea is None:
+            return None
+        clientes, hay_siguientes, vigente = instantanea
+        self.almacen.clientes = {cliente.id: cliente for cliente in clientes}
+        self.hay_anteriores = False
+        self.hay_siguientes = hay_siguientes
+        self.table.setRowCount(len(clientes))
+        for row_idx, cliente in enumerate(clientes):
+            self.mostrar_fila(row_idx, cliente)  # Los colores se calculan con la fecha de hoy.
+        return vigente
+
+    def completar_inicio(self, instantanea_vigente):
+        """Valida la tabla mostrada al abrir y programa los avisos"""
         try:
-            nueva_fecha = datetime.now().strftime("%Y-%m-%d")  # Fecha actual
+            # Si la base cambió desde el cierre (otra computadora, sincronización), se vuelve a leer la página.
+            if not instantanea_vigente:
+                self.load_data()
+            self.alertas.cargar()
+            self.recargar_resumen()
+        except sqlite3.OperationalError:
+            # Base bloqueada por otra instancia: se sigue mostrando la copia y se reintenta como la vigilancia.
+            QTimer.singleShot(INTERVALO_VIGILANCIA_MS, lambda: self.completar_inicio(instantanea_vigente))
+            return
+        self.timer_resumen = QTimer(self)
+        self.timer_resumen.timeout.connect(self.actualizar_panel)
+        self.timer_resumen.start(INTERVALO_RESUMEN_MS)
 
-            # Actualizar la fecha de último cambio de pezoneras en la base de datos
-            conn = sqlite3.connect("clientes.db")
-            cursor = conn.cursor()
-            cursor.execute("UPDATE clientes SET ultimo_cambio_pezoneras = ? WHERE id = ?", (nueva_fecha, id_cliente))
+    def recargar_resumen(self):
+        """Lee los contadores mantenidos por la base (incluyen los cambios de otras computadoras)"""
+        conn = conectar_db()
+        try:
+            self.resumen.cargar(conn.cursor())
+        finally:
+            conn.close()
+        self.actualizar_panel()
+
+    def actualizar_panel(self):
+        """Muestra los contadores del resumen (no recorre clientes)"""
+        conteos, total_vacas = self.resumen.vigentes()
+        for componente, label in self.resumen_labels.items():
+            conteo = conteos[componente]
+            label.setText(f"<b>{componente.capitalize()}</b>: "
+                          f"<span style='color:red'>{conteo['vencido']} vencidos</span> · "
+                          f"<span style='color:darkorange'>{conteo['por_vencer']} por vencer</span> · "
+                          f"<span style='color:green'>{conteo['al_dia']} al día</span>")
+        self.vacas_label.setText(f"<b>Vacas</b>: {total_vacas}")
+
+    def escribir_cliente(self, id_cliente, operacion):
+        """Ejecuta la escritura de un cliente y actualiza el resumen con su estado antes y después"""
+        def escribir(cursor):
+            antes = estado_cliente(cursor, id_cliente) if id_cliente is not None else None
+            resultado = operacion(cursor)
+            # En un alta el id lo devuelve la operación.
+            despues = estado_cliente(cursor, id_cliente if id_cliente is not None else resultado)
+            return resultado, antes, despues
+
+        resultado, antes, despues = ejecutar_con_reintentos(escribir)
+        self.resumen.aplicar(antes, despues)
+        self.actualizar_panel()
+        return resultado
+
+    def closeEvent(self, event):
+        """Guarda la primera página de la tabla para mostrarla al volver a abrir"""
+        try:
+            # Se lee de la base y no de la tabla, que puede estar atrasada respecto de otra computadora.
+            # Dentro de la transacción de lectura nadie puede confirmar una escritura: la clave es la de estas filas.
+            conn = conectar_db()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN")
+                clientes = AlmacenClientes().pagina(cursor)
+                clave = clave_base()
+                conn.rollback()
+            finally:
+                conn.close()
+            guardar_instantanea(clientes, len(clientes) == TAMANO_PAGINA, clave)
+        except Exception:
+            pass  # Sin copia el próximo inicio lee la base como siempre; no impide cerrar.
+        super().closeEvent(event)
+
+    def puede_cargar_mas(self, al_final=True):
+        """Indica si quedan clientes por leer después de la última fila (o antes de la primera)"""
+        return self.table.rowCount() > 0 and (self.hay_siguientes if al_final else self.hay_anteriores)
+
+    def cargar_mas(self, al_final=True):
+        """Lee la página siguiente (o la anterior) y descarta la del otro extremo si hay demasiadas en memoria"""
+        barra = self.table.verticalScrollBar()
+        fila_borde = self.table.rowCount() - 1 if al_final else 0
+        clave = self.almacen.clave(self.table.item(fila_borde, 0).data(Qt.ItemDataRole.UserRole))
+
+        conn = conectar_db()
+        try:
+            clientes = self.almacen.pagina(conn.cursor(), clave, hacia_atras=not al_final)
+        except sqlite3.Error:
+            return  # Base bloqueada: la tabla queda como está y el próximo desplazamiento vuelve a intentarlo.
+        finally:
+            conn.close()
+        if al_final:
+            self.hay_siguientes = len(clientes) == TAMANO_PAGINA
+        else:
+            self.hay_anteriores = len(clientes) == TAMANO_PAGINA
+        if not clientes:
+            return
 
-            # Recalcular la fecha de cambio para la columna 5 (Próximo Cambio)
-            vacas_item = self.table.item(row_idx, 1)
-            ordenes_item = self.table.item(row_idx, 2)
-            bajadas_item = self.table.item(row_idx, 3)
-
-            # Validar que los valores no sean None
-            if vacas_item is None or ordenes_item is None or bajadas_item is None:
-                raise ValueError("Faltan datos para calcular el próximo cambio de pezoneras.")
-
-            vacas = int(vacas_item.text())
-            ordenes = int(ordenes_item.text())
-            bajadas = int(bajadas_item.text())
-
-            if vacas > 0 and ordenes > 0 and bajadas > 0:
-                dias_adicionales = 2500 / (vacas * (ordenes / bajadas))
-                dias_adicionales = int(dias_adicionales)
-                proximo_cambio = datetime.now() + timedelta(days=dias_adicionales)
-                proximo_cambio_str = proximo_cambio.strftime("%Y-%m-%d")
-
-                # Actualizar la columna 5 (Próximo Cambio) en la tabla
-                fecha_item = QTableWidgetItem(proximo_cambio_str)
-                dias_restantes = (proximo_cambio - datetime.now()).days
-                self.colorear_celda(fecha_item, dias_restantes)
-                self.table.setItem(row_idx, 5, fecha_item)
-
-                # Guardar el próximo cambio en la base de datos
-                cursor.execute("UPDATE clientes SET proximo_cambio_pezoneras = ? WHERE id = ?", (proximo_cambio_str, id_cliente))
+        posicion = barra.value()
+        if al_final:
+            inicio = self.table.rowCount()
+            self.table.setRowCount(inicio + len(clientes))
+        else:
+            inicio = 0
+            self.table.model().insertRows(0, len(clientes))
+            posicion += len(clientes)
+        for row_idx, cliente in enumerate(clientes, inicio):
+            self.mostrar_fila(row_idx, cliente)
+
+        # Ventana acotada: la memoria no depende de cuántos clientes haya en total.
+        sobrantes = self.table.rowCount() - TAMANO_PAGINA * PAGINAS_EN_MEMORIA
+        if sobrantes > 0:
+            if al_final:
+                filas = range(sobrantes)
+                self.hay_anteriores = True
+            else:
+                filas = range(self.table.rowCount() - sobrantes, self.table.rowCount())
+                self.hay_siguientes = True
+            for row_idx in filas:
+                self.almacen.clientes.pop(self.table.item(row_idx, 0).data(Qt.ItemDataRole.UserRole), None)
+            if al_final:
+                self.table.model().removeRows(0, sobrantes)
+                posicion -= sobrantes
             else:
-                # Si no se puede calcular el próximo cambio, guardar "Sin datos"
-                cursor.execute("UPDATE clientes SET proximo_cambio_pezoneras = ? WHERE id = ?", ("Sin datos", id_cliente))
-                self.table.setItem(row_idx, 5, QTableWidgetItem("Sin datos"))
+                self.table.setRowCount(self.table.rowCount() - sobrantes)
+        barra.setValue(posicion)
+
+    def revisar_desplazamiento(self, valor):
+        """Pide otra página cuando la tabla se acerca al final o al principio de lo cargado"""
+        barra = self.table.verticalScrollBar()
+        if valor >= barra.maximum() - 5 and self.puede_cargar_mas(al_final=True):
+            self.cargar_mas(al_final=True)
+        elif valor <= barra.minimum() + 5 and self.puede_cargar_mas(al_final=False):
+            self.cargar_mas(al_final=False)
+
+    def recargar_ventana(self):
+        """Vuelve a leer las filas cargadas desde la primera, manteniendo la posición de la tabla"""
+        if self.table.rowCount() == 0:
+            self.load_data()
+            return
+        posicion = self.table.verticalScrollBar().value()
+        clave = self.almacen.clave(self.table.item(0, 0).data(Qt.ItemDataRole.UserRole))
+        hay_anteriores = self.hay_anteriores
+        self.load_data(clave if hay_anteriores else None, max(self.table.rowCount(), TAMANO_PAGINA))
+        self.hay_anteriores = hay_anteriores
+        self.table.verticalScrollBar().setValue(posicion)
+
+    def fila_cliente(self, id_cliente):
+        """Devuelve la fila de la tabla en la que se muestra el cliente (o -1 si no está cargado)"""
+        for row_idx in range(self.table.rowCount()):
+            item = self.table.item(row_idx, 0)
+            if item is not None and item.data(Qt.ItemDataRole.UserRole) == id_cliente:
+                return row_idx
+        return -1
+
+    def mostrar_fila(self, row_idx, cliente):
+        """Muestra los datos de un cliente del almacén en una fila de la tabla"""
+        id_cliente = cliente.id
+
+        # Columna 0: Nombre del Cliente (asociar el ID del cliente)
+        nombre_item = QTableWidgetItem(cliente.nombre)
+        nombre_item.setData(Qt.ItemDataRole.UserRole, id_cliente)  # Asociar el ID del cliente
+        self.table.setItem(row_idx, 0, nombre_item)
+
+        # Columna 1: Vacas
+        self.table.setItem(row_idx, 1, QTableWidgetItem(str(cliente.vacas)))
+
+        # Columna 2: Ordeñes
+        ordenes_item = QTableWidgetItem(str(cliente.ordenes))
+        ordenes_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table.setItem(row_idx, 2, ordenes_item)
+
+        # Columna 3: Bajadas
+        bajadas_item = QTableWidgetItem(str(cliente.bajadas))
+        bajadas_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table.setItem(row_idx, 3, bajadas_item)
+
+        # Columna 4: Último Cambio de Pezoneras
+        self.table.setItem(row_idx, 4, self.crear_celda_fecha(cliente.ultimo_cambio_pezoneras))
+
+        # Columna 5: Próximo Cambio de Pezoneras
+        proximo_cambio_item = self.crear_celda_fecha(cliente.proximo_cambio_pezoneras, colorear=True)
+        if cliente.uso_pezoneras is not None:
+            restante = vida_restante(self.reglas, "pezoneras", id_cliente, cliente.uso_pezoneras, cliente.bajadas)
+            if restante is not None:
+                proximo_cambio_item.setToolTip(f"Vida restante: {int(restante)} ordeñes por unidad")
+        self.table.setItem(row_idx, 5, proximo_cambio_item)
+
+        # Columna 6: Botón para marcar cambio de pezoneras
+        btn_pezoneras = QPushButton("Marcar Cambio")
+        btn_pezoneras.clicked.connect(self.create_marcar_cambio_pezoneras_handler(id_cliente))
+        self.table.setCellWidget(row_idx, 6, btn_pezoneras)
+
+        # Columna 7: Último Cambio de Mangueras
+        self.table.setItem(row_idx, 7, self.crear_celda_fecha(cliente.ultimo_cambio))
+
+        # Columna 8: Próximo Cambio de Mangueras
+        self.table.setItem(row_idx, 8, self.crear_celda_fecha(cliente.proximo_cambio_mangueras, colorear=True))
+
+        # Columna 9: Botón para marcar cambio de mangueras
+        btn_mangueras = QPushButton("Marcar Cambio de Manguera")
+        btn_mangueras.clicked.connect(self.create_marcar_cambio_mangueras_handler(id_cliente))
+        self.table.setCellWidget(row_idx, 9, btn_mangueras)
+
+        # Columna 10: Último Cambio de Pulsador
+        self.table.setItem(row_idx, 10, self.crear_celda_fecha(cliente.ultimo_cambio_pulsadores))
+
+        # Columna 11: Próximo Cambio de Pulsador
+        restante = None
+        if cliente.uso_pulsadores is not None:
+            restante = vida_restante(self.reglas, "pulsadores", id_cliente, cliente.uso_pulsadores, cliente.bajadas)
+        if cliente.ultimo_cambio_pulsadores is None:
+            proximo_cambio_pulsadores_item = QTableWidgetItem("Sin datos")
+        elif restante is not None and cliente.proximo_cambio_pulsadores is not None:
+            # Con ordeñes importados, la fecha guardada ya refleja el uso real.
+            proximo_cambio_pulsadores_item = self.crear_celda_fecha(cliente.proximo_cambio_pulsadores, colorear=True)
+            proximo_cambio_pulsadores_item.setToolTip(f"Vida restante: {int(restante)} ordeñes por unidad")
+        else:
+            try:
+                dias_adicionales = self.reglas.dias("pulsadores", id_cliente, cliente.vacas, cliente.ordenes, cliente.bajadas)
+                if dias_adicionales is not None:
+                    # Calcular la fecha del próximo cambio usando la fecha de la columna 10
+                    proximo_cambio = cliente.ultimo_cambio_pulsadores + timedelta(days=dias_adicionales)
+                    proximo_cambio_pulsadores_item = self.crear_celda_fecha(proximo_cambio, colorear=True)
+                else:
+                    proximo_cambio_pulsadores_item = QTableWidgetItem("Sin datos")
+            except Exception:
+                proximo_cambio_pulsadores_item = QTableWidgetItem("Error")
+
+        self.table.setItem(row_idx, 11, proximo_cambio_pulsadores_item)
+
+        # Columna 12: Botón para marcar cambio de pulsadores
+        btn_pulsadores = QPushButton("Marcar Cambio de Pulsador")
+        btn_pulsadores.clicked.connect(self.create_marcar_cambio_pulsadores_handler(id_cliente))
+        self.table.setCellWidget(row_idx, 12, btn_pulsadores)
+
+        # Columna 13: Fecha de Último Chequeo
+        self.table.setItem(row_idx, 13, self.crear_celda_fecha(cliente.ultimo_chequeo))
+
+        # Columna 14: Fecha del Próximo Chequeo
+        self.table.setItem(row_idx, 14, self.crear_celda_fecha(cliente.proximo_chequeo, colorear=True))
+
+        # Columna 15: Botón para marcar chequeo
+        btn_chequeo = QPushButton("Marcar Chequeo")
+        btn_chequeo.clicked.connect(self.create_marcar_chequeo_handler(id_cliente))
+        self.table.setCellWidget(row_idx, 15, btn_chequeo)
+
+    def crear_celda_fecha(self, fecha, colorear=False):
+        """Crea la celda centrada de una fecha, coloreada según los días restantes si se pide"""
+        item = QTableWidgetItem(escribir_fecha(fecha))
+        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        if colorear and fecha is not None:
+            self.colorear_celda(item, (fecha - datetime.now()).days)
+        return item
 
-            conn.commit()
-            conn.close()
+    def marcar_cambio_pezoneras(self, id_cliente, row_idx):
+        """Marca un cambio de pezoneras para un cliente y recalcula el próximo cambio (columnas 4 y 5)"""
+        try:
+            cliente = self.almacen.clientes[id_cliente]
+            hoy = leer_fecha(datetime.now().strftime("%Y-%m-%d"))  # Fecha actual
 
-            # Actualizar la columna 4 (Último Cambio de Pezoneras) en la tabla
-            nuevo_item = QTableWidgetItem(nueva_fecha)
-            nuevo_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 4, nuevo_item)
+            # Recalcular la fecha de cambio para la columna 5 (Próximo Cambio)
+            dias_adicionales = self.reglas.dias("pezoneras", id_cliente, cliente.vacas, cliente.ordenes, cliente.bajadas)
+            # Si no se puede calcular el próximo cambio, se guarda "Sin datos"
+            proximo_cambio = hoy + timedelta(days=dias_adicionales) if dias_adicionales is not None else None
+
+            # Guardar los cambios en la base de datos si nadie modificó el cliente desde otra computadora
+            def guardar(cursor):
+                version = reservar_version(cursor, id_cliente, cliente.version)
+                cursor.execute("UPDATE clientes SET ultimo_cambio_pezoneras = ?, proximo_cambio_pezoneras = ? WHERE id = ?",
+                               (escribir_fecha(hoy), escribir_fecha(proximo_cambio), id_cliente))
+                cursor.execute("UPDATE uso_ordenie SET ordenes_pezoneras = 0 WHERE id_cliente = ?", (id_cliente,))
+                return version
+
+            cliente.version = self.escribir_cliente(id_cliente, guardar)
+            cliente.ultimo_cambio_pezoneras, cliente.proximo_cambio_pezoneras = hoy, proximo_cambio
+            if cliente.uso_pezoneras is not None:
+                cliente.uso_pezoneras = 0
+            self.alertas.actualizar_cliente(id_cliente)
+            self.mostrar_fila(row_idx, cliente)
 
             QMessageBox.information(self, "Éxito", "Cambio de pezoneras registrado correctamente.")
+        except ConflictoVersion as e:
+            self.avisar_conflicto(e)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error al marcar el cambio: {str(e)}")
 
     def marcar_cambio_pulsadores(self, id_cliente, row_idx):
         """Marca un cambio de pulsadores para un cliente y actualiza las columnas 10 y 11"""
         try:
-            nueva_fecha = datetime.now().strftime("%Y-%m-%d")  # Fecha actual
-
-            # Actualizar la columna 10 (Último Cambio de Pulsador)
-            ultimo_cambio_item = QTableWidgetItem(nueva_fecha)
-            ultimo_cambio_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 10, ultimo_cambio_item)
-
-            # Obtener la fecha de último cambio de pulsador desde la columna 10
-            ultimo_cambio_pulsadores_item = self.table.item(row_idx, 10)
-            if ultimo_cambio_pulsadores_item is None or ultimo_cambio_pulsadores_item.text() == "Sin datos":
-                raise ValueError("La fecha de último cambio de pulsador no es válida.")
-
-            ultimo_cambio_pulsadores = datetime.strptime(ultimo_cambio_pulsadores_item.text(), "%Y-%m-%d")
+            cliente = self.almacen.clientes[id_cliente]
+            hoy = leer_fecha(datetime.now().strftime("%Y-%m-%d"))  # Fecha actual
 
             # Calcular el próximo cambio (columna 11)
-            vacas_item = self.table.item(row_idx, 1)
-            vacas = int(vacas_item.text()) if vacas_item else 0
-            ordenes = int(self.table.item(row_idx, 2).text())
-            bajadas = int(self.table.item(row_idx, 3).text())
-
-            if vacas > 0 and ordenes > 0 and bajadas > 0:
-                dias_adicionales = 7000 / (vacas * (ordenes / bajadas))
-                dias_adicionales = int(dias_adicionales)
-                proximo_cambio = ultimo_cambio_pulsadores + timedelta(days=dias_adicionales)
-                proximo_cambio_item = QTableWidgetItem(proximo_cambio.strftime("%Y-%m-%d"))
-                dias_restantes = (proximo_cambio - datetime.now()).days
-                self.colorear_celda(proximo_cambio_item, dias_restantes)
-            else:
-                proximo_cambio_item = QTableWidgetItem("Sin datos")
-
-            self.table.setItem(row_idx, 11, proximo_cambio_item)
-
-            # Guardar los cambios en la base de datos
-            conn = sqlite3.connect("clientes.db")
-            cursor = conn.cursor()
-            cursor.execute("UPDATE clientes SET ultimo_cambio_pulsadores = ?, proximo_cambio_pulsadores = ? WHERE id = ?", 
-                           (nueva_fecha, proximo_cambio.strftime("%Y-%m-%d"), id_cliente))
-            conn.commit()
-            conn.close()
+            dias_adicionales = self.reglas.dias("pulsadores", id_cliente, cliente.vacas, cliente.ordenes, cliente.bajadas)
+            proximo_cambio = hoy + timedelta(days=dias_adicionales) if dias_adicionales is not None else None
+
+            # Guardar los cambios en la base de datos si nadie modificó el cliente desde otra computadora
+            def guardar(cursor):
+                version = reservar_version(cursor, id_cliente, cliente.version)
+                cursor.execute("UPDATE clientes SET ultimo_cambio_pulsadores = ?, proximo_cambio_pulsadores = ? WHERE id = ?", 
+                               (escribir_fecha(hoy), escribir_fecha(proximo_cambio), id_cliente))
+                cursor.execute("UPDATE uso_ordenie SET ordenes_pulsadores = 0 WHERE id_cliente = ?", (id_cliente,))
+                return version
+
+            cliente.version = self.escribir_cliente(id_cliente, guardar)
+            cliente.ultimo_cambio_pulsadores, cliente.proximo_cambio_pulsadores = hoy, proximo_cambio
+            if cliente.uso_pulsadores is not None:
+                cliente.uso_pulsadores = 0
+            self.alertas.actualizar_cliente(id_cliente)
+            self.mostrar_fila(row_idx, cliente)
 
             QMessageBox.information(self, "Éxito", "Cambio de pulsadores registrado correctamente.")
+        except ConflictoVersion as e:
+            self.avisar_conflicto(e)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error al marcar el cambio: {str(e)}")
 
     def marcar_cambio_mangueras(self, id_cliente, row_idx):
         """Marca un cambio de mangueras para un cliente y actualiza las columnas 7 y 8"""
         try:
+            cliente = self.almacen.clientes[id_cliente]
             # Fecha actual
             nueva_fecha = datetime.now().strftime("%Y-%m-%d")
 
-            # Calcular el próximo cambio de mangueras (6 meses después de la fecha actual)
-            proximo_cambio_mangueras = (datetime.now() + timedelta(days=180)).strftime("%Y-%m-%d")
-
-            # Actualizar la columna 7 (Último Cambio de Mangueras)
-            fecha_item = QTableWidgetItem(nueva_fecha)
-            fecha_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 7, fecha_item)
+            # Calcular el próximo cambio de mangueras según la regla configurada (por defecto, 180 días)
+            proximo_cambio_mangueras = self.reglas.proxima_fecha("mangueras", id_cliente, nueva_fecha,
+                                                                 cliente.vacas, cliente.ordenes, cliente.bajadas)
 
-            # Actualizar la columna 8 (Próximo Cambio de Mangueras)
-            proximo_item = QTableWidgetItem(proximo_cambio_mangueras)
-            proximo_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            dias_restantes = (datetime.strptime(proximo_cambio_mangueras, "%Y-%m-%d") - datetime.now()).days
-            self.colorear_celda(proximo_item, dias_restantes)
-            self.table.setItem(row_idx, 8, proximo_item)
+            # Guardar los cambios en la base de datos si nadie modificó el cliente desde otra computadora
+            def guardar(cursor):
+                version = reservar_version(cursor, id_cliente, cliente.version)
+                cursor.execute("""
+                    UPDATE clientes 
+                    SET ultimo_cambio = ?, proximo_cambio_mangueras = ? 
+                    WHERE id = ?
+                """, (nueva_fecha, proximo_cambio_mangueras, id_cliente))
+                return version
 
-            # Guardar los cambios en la base de datos
-            conn = sqlite3.connect("clientes.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE clientes 
-                SET ultimo_cambio = ?, proximo_cambio_mangueras = ? 
-                WHERE id = ?
-            """, (nueva_fecha, proximo_cambio_mangueras, id_cliente))
-            conn.commit()
-            conn.close()
+            cliente.version = self.escribir_cliente(id_cliente, guardar)
+            cliente.ultimo_cambio = leer_fecha(nueva_fecha)
+            cliente.proximo_cambio_mangueras = leer_fecha(proximo_cambio_mangueras)
+            self.alertas.actualizar_cliente(id_cliente)
+            self.mostrar_fila(row_idx, cliente)
 
             # Mostrar mensaje de éxito
             QMessageBox.information(self, "Éxito", "Cambio de mangueras registrado correctamente.")
+        except ConflictoVersion as e:
+            self.avisar_conflicto(e)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error al marcar el cambio: {str(e)}")
 
     def marcar_chequeo(self, id_cliente, row_idx):
         """Marca un chequeo para un cliente y actualiza las columnas 13 y 14"""
         try:
-            nueva_fecha = datetime.now().strftime("%Y-%m-%d")  # Fecha actual
-
-            # Actualizar la columna 13 (Fecha de Último Chequeo)
-            ultimo_chequeo_item = QTableWidgetItem(nueva_fecha)
-            ultimo_chequeo_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 13, ultimo_chequeo_item)
+            cliente = self.almacen.clientes[id_cliente]
+            hoy = leer_fecha(datetime.now().strftime("%Y-%m-%d"))  # Fecha actual
 
             # Calcular el próximo chequeo (columna 14)
-            vacas_item = self.table.item(row_idx, 1)
-            vacas = int(vacas_item.text()) if vacas_item else 0
-            ordenes = int(self.table.item(row_idx, 2).text())
-            bajadas = int(self.table.item(row_idx, 3).text())
-
-            if vacas > 0 and ordenes > 0 and bajadas > 0:
-                dias_adicionales = 7000 / (vacas * (ordenes / bajadas))
-                dias_adicionales = int(dias_adicionales)
-                proximo_chequeo = datetime.now() + timedelta(days=dias_adicionales)
-                proximo_chequeo_item = QTableWidgetItem(proximo_chequeo.strftime("%Y-%m-%d"))
-                dias_restantes = (proximo_chequeo - datetime.now()).days
-                self.colorear_celda(proximo_chequeo_item, dias_restantes)
-            else:
-                proximo_chequeo_item = QTableWidgetItem("Sin datos")
+            dias_adicionales = self.reglas.dias("chequeo", id_cliente, cliente.vacas, cliente.ordenes, cliente.bajadas)
+            proximo_chequeo = hoy + timedelta(days=dias_adicionales) if dias_adicionales is not None else None
 
-            self.table.setItem(row_idx, 14, proximo_chequeo_item)
+            # Guardar los cambios en la base de datos si nadie modificó el cliente desde otra computadora
+            def guardar(cursor):
+                version = reservar_version(cursor, id_cliente, cliente.version)
+                cursor.execute("UPDATE clientes SET ultimo_chequeo = ?, proximo_chequeo = ? WHERE id = ?", 
+                               (escribir_fecha(hoy), escribir_fecha(proximo_chequeo), id_cliente))
+                return version
 
-            # Guardar los cambios en la base de datos
-            conn = sqlite3.connect("clientes.db")
-            cursor = conn.cursor()
-            cursor.execute("UPDATE clientes SET ultimo_chequeo = ?, proximo_chequeo = ? WHERE id = ?", 
-                           (nueva_fecha, proximo_chequeo.strftime("%Y-%m-%d"), id_cliente))
-            conn.commit()
-            conn.close()
+            cliente.version = self.escribir_cliente(id_cliente, guardar)
+            cliente.ultimo_chequeo, cliente.proximo_chequeo = hoy, proximo_chequeo
+            self.alertas.actualizar_cliente(id_cliente)
+            self.mostrar_fila(row_idx, cliente)
 
             QMessageBox.information(self, "Éxito", "Chequeo registrado correctamente.")
+        except ConflictoVersion as e:
+            self.avisar_conflicto(e)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error al marcar el chequeo: {str(e)}")
 
     def delete_cliente(self):
-        """Elimina el cliente seleccionado de la base de datos y la tabla"""
+        """Archiva el cliente seleccionado y lo quita de la tabla"""
         selected_row = self.table.currentRow()  # Obtiene la fila seleccionada en la tabla.
         if selected_row == -1:  # Si no hay ninguna fila seleccionada...
             QMessageBox.warning(self, "Error", "Seleccione un cliente para eliminar.")  # Muestra un mensaje de advertencia.
@@ -644,7 +2903,8 @@ class ClienteApp(QWidget):
         cliente_nombre = self.table.item(selected_row, 0).text()  # Obtiene el nombre del cliente de la columna 0.
         confirm = QMessageBox.question(
             self, "Confirmar Eliminación",
-            f"¿Está seguro de que desea eliminar al cliente '{cliente_nombre}'?",
+            f"¿Está seguro de que desea eliminar al cliente '{cliente_nombre}'?\n"
+            "Quedará en Clientes Archivados y se podrá restaurar.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )  # Muestra un cuadro de diálogo para confirmar la eliminación.
 
@@ -657,31 +2917,130 @@ class ClienteApp(QWidget):
                 QMessageBox.warning(self, "Error", "No se pudo obtener el ID del cliente.")
                 return
 
-            # Eliminar el cliente de la base de datos
-            conn = sqlite3.connect("clientes.db")  # Conecta a la base de datos SQLite.
-            cursor = conn.cursor()  # Crea un cursor para ejecutar comandos SQL.
-            cursor.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))  # Elimina el cliente con el ID dado.
-            conn.commit()  # Guarda los cambios en la base de datos.
-            conn.close()  # Cierra la conexión con la base de datos.
+            # Archivar el cliente, solo si nadie lo modificó desde otra computadora
+            try:
+                self.escribir_cliente(
+                    cliente_id, lambda cursor: archivar_cliente(cursor, cliente_id, self.almacen.version(cliente_id)))
+            except ConflictoVersion as e:
+                self.avisar_conflicto(e)
+                return
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Ocurrió un error al eliminar el cliente: {str(e)}")
+                return
+            self.almacen.clientes.pop(cliente_id, None)
+            self.reglas.cargar()  # Sus reglas propias pasaron al archivo.
+            self.alertas.eliminar_cliente(cliente_id)  # Descarta los avisos pendientes del cliente.
 
             # Eliminar la fila correspondiente de la tabla
             self.table.removeRow(selected_row)
             QMessageBox.information(self, "Éxito", f"Cliente '{cliente_nombre}' eliminado correctamente.")
 
+    def restaurar_archivado(self):
+        """Busca un cliente archivado por nombre y lo vuelve a dar de alta"""
+        texto, ok = QInputDialog.getText(self, "Clientes Archivados", "Buscar por nombre (vacío = todos):")
+        if not ok:
+            return
+
+        conn = conectar_db()
+        archivados = buscar_archivados(conn.cursor(), texto.strip())
+        conn.close()
+        if not archivados:
+            QMessageBox.information(self, "Clientes Archivados", "No se encontraron clientes archivados.")
+            return
+
+        opciones = [f"{nombre} ({vacas} vacas, archivado el {archivado[:10]})" for _, nombre, vacas, archivado in archivados]
+        elegido, ok = QInputDialog.getItem(self, "Restaurar Cliente", "Seleccione el cliente a restaurar:", opciones, 0, False)
+        if not ok:
+            return
+        uid, cliente_nombre, _, _ = archivados[opciones.index(elegido)]
+
+        try:
+            # Vuelve con un id nuevo: para el resumen es un alta.
+            cliente_id = self.escribir_cliente(None, lambda cursor: restaurar_cliente(cursor, uid))
+        except ConflictoVersion as e:
+            self.avisar_conflicto(e)
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al restaurar el cliente: {str(e)}")
+            return
+        self.reglas.cargar()  # Sus reglas propias quedaron con el id nuevo.
+        self.load_data()
+        self.alertas.actualizar_cliente(cliente_id)
+        QMessageBox.information(self, "Éxito", f"Cliente '{cliente_nombre}' restaurado correctamente.")
+
     def calcular_intervalo(self, vacas):
-        """Calcula el intervalo de cambio según la cantidad de vacas"""
-        if vacas <= 50:
-            return 45  # Menos de 50 vacas: 45 días
-        elif vacas <= 100:
-            return 30  # Entre 51 y 100 vacas: 30 días
-        elif vacas > 150:
-            return 20  # Más de 150 vacas: 20 días
+        """Calcula el intervalo de cambio según la cantidad de vacas (tramos por defecto de la regla `por_rodeo`)"""
+        return calcular_dias("por_rodeo", json.dumps(TRAMOS_POR_DEFECTO, sort_keys=True), vacas, 0, 0)
+
+    def configurar_regla(self):
+        """Permite editar la regla de intervalo de un componente, general o para un cliente"""
+        componente, ok = QInputDialog.getItem(self, "Configurar Regla", "Componente:", list(COMPONENTES), 0, False)
+        if not ok:
+            return
+
+        conn = conectar_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, nombre FROM clientes ORDER BY nombre ASC")
+        clientes = cursor.fetchall()
+        conn.close()
+
+        opciones = ["Todos los clientes"] + [cliente[1] for cliente in clientes]
+        alcance, ok = QInputDialog.getItem(self, "Configurar Regla", "Aplicar a:", opciones, 0, False)
+        if not ok:
+            return
+        id_cliente = None if alcance == opciones[0] else clientes[opciones.index(alcance) - 1][0]
+
+        descripciones = list(TIPOS_REGLA.values())
+        descripcion, ok = QInputDialog.getItem(self, "Configurar Regla", "Tipo de regla:", descripciones, 0, False)
+        if not ok:
+            return
+        tipo = list(TIPOS_REGLA)[descripciones.index(descripcion)]
+
+        # Los valores actuales de la regla se proponen como punto de partida.
+        tipo_actual, parametros_actuales = self.reglas.regla(componente, id_cliente)
+        actual = json.loads(parametros_actuales) if tipo_actual == tipo else {}
+        actual = {**REGLAS_POR_DEFECTO["pezoneras"][1], **REGLAS_POR_DEFECTO["mangueras"][1],
+                  **TRAMOS_POR_DEFECTO, **actual}
+
+        if tipo == "uso":
+            constante, ok = QInputDialog.getInt(self, "Configurar Regla", "Constante de uso:",
+                                                int(actual["constante"]), 1, 1000000)
+            parametros = {"constante": constante}
+        elif tipo == "dias_fijos":
+            dias, ok = QInputDialog.getInt(self, "Configurar Regla", "Cantidad de días:", int(actual["dias"]), 1, 3650)
+            parametros = {"dias": dias}
         else:
-            return 30  # Valor por defecto: 30 días
+            texto_tramos = ", ".join(f"{limite}:{dias}" for limite, dias in actual["tramos"])
+            texto, ok = QInputDialog.getText(self, "Configurar Regla",
+                                             "Tramos (hasta_vacas:días separados por coma):", text=texto_tramos)
+            if not ok:
+                return
+            resto, ok = QInputDialog.getInt(self, "Configurar Regla", "Días para rodeos más grandes:",
+                                            int(actual["resto"]), 1, 3650)
+            try:
+                tramos = sorted([int(limite), int(dias)] for limite, dias in
+                                (tramo.split(":") for tramo in texto.split(",") if tramo.strip()))
+            except ValueError:
+                QMessageBox.warning(self, "Error", "Los tramos deben tener el formato hasta_vacas:días.")
+                return
+            parametros = {"tramos": tramos, "resto": resto}
+        if not ok:
+            return
+
+        try:
+            self.reglas.guardar_regla(componente, tipo, parametros, id_cliente)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al guardar la regla: {str(e)}")
+            return
+
+        # Los próximos cambios se recalcularon en la base de datos; se refrescan la tabla y los avisos.
+        self.load_data()
+        self.alertas.cargar()
+        QMessageBox.information(self, "Éxito", "Regla de intervalo actualizada correctamente.")
 
     def select_cliente_para_modificar(self):
         """Permite seleccionar un cliente para modificar su cantidad de vacas"""
-        conn = sqlite3.connect("clientes.db")
+        conn = conectar_db()
         cursor = conn.cursor()
         cursor.execute("SELECT id, nombre FROM clientes")
         clientes = cursor.fetchall()
@@ -706,7 +3065,7 @@ class ClienteApp(QWidget):
 
     def select_cliente_para_modificar_ordenes(self):
         """Permite seleccionar un cliente para modificar su cantidad de ordeñes"""
-        conn = sqlite3.connect("clientes.db")
+        conn = conectar_db()
         cursor = conn.cursor()
         cursor.execute("SELECT id, nombre FROM clientes")
         clientes = cursor.fetchall()
@@ -731,7 +3090,7 @@ class ClienteApp(QWidget):
 
     def select_cliente_para_modificar_bajadas(self):
         """Permite seleccionar un cliente para modificar su cantidad de bajadas"""
-        conn = sqlite3.connect("clientes.db")
+        conn = conectar_db()
         cursor = conn.cursor()
         cursor.execute("SELECT id, nombre FROM clientes")
         clientes = cursor.fetchall()
@@ -759,46 +3118,46 @@ class ClienteApp(QWidget):
         vacas, ok = QInputDialog.getInt(self, "Modificar Vacas", "Ingrese nueva cantidad de vacas:")
 
         if ok:
-            conn = sqlite3.connect("clientes.db")
-            cursor = conn.cursor()
+            def guardar(cursor):
+                # Obtener los datos actuales del cliente
+                cursor.execute("SELECT ordenes, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores FROM clientes WHERE id = ?", (cliente_id,))
+                cliente = cursor.fetchone()
+                if not cliente:
+                    return None
 
-            # Obtener los datos actuales del cliente
-            cursor.execute("SELECT ordenes, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores FROM clientes WHERE id = ?", (cliente_id,))
-            cliente = cursor.fetchone()
-            if not cliente:
-                QMessageBox.warning(self, "Error", "Cliente no encontrado.")
-                conn.close()
-                return
+                ordenes, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores = cliente
 
-            ordenes, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores = cliente
+                # Recalcular el próximo cambio de pezoneras
+                proximo_cambio_pezoneras = self.reglas.proxima_fecha("pezoneras", cliente_id, ultimo_cambio_pezoneras,
+                                                                     vacas, ordenes, bajadas)
 
-            # Recalcular el próximo cambio de pezoneras
-            if ultimo_cambio_pezoneras and vacas > 0 and ordenes > 0 and bajadas > 0:
-                dias_adicionales_pezoneras = 2500 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_cambio_pezoneras = datetime.strptime(ultimo_cambio_pezoneras, "%Y-%m-%d")
-                proximo_cambio_pezoneras = (fecha_ultimo_cambio_pezoneras + timedelta(days=int(dias_adicionales_pezoneras))).strftime("%Y-%m-%d")
-            else:
-                proximo_cambio_pezoneras = "Sin datos"
-
-            # Recalcular el próximo cambio de pulsadores
-            if ultimo_cambio_pulsadores and vacas > 0 and ordenes > 0 and bajadas > 0:
-                dias_adicionales_pulsadores = 7000 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_cambio_pulsadores = datetime.strptime(ultimo_cambio_pulsadores, "%Y-%m-%d")
-                proximo_cambio_pulsadores = (fecha_ultimo_cambio_pulsadores + timedelta(days=int(dias_adicionales_pulsadores))).strftime("%Y-%m-%d")
-            else:
-                proximo_cambio_pulsadores = "Sin datos"
+                # Recalcular el próximo cambio de pulsadores
+                proximo_cambio_pulsadores = self.reglas.proxima_fecha("pulsadores", cliente_id, ultimo_cambio_pulsadores,
+                                                                      vacas, ordenes, bajadas)
 
-            # Actualizar los datos en la base de datos
-            cursor.execute("""
-                UPDATE clientes
-                SET vacas = ?, proximo_cambio_pezoneras = ?, proximo_cambio_pulsadores = ?
-                WHERE id = ?
-            """, (vacas, proximo_cambio_pezoneras, proximo_cambio_pulsadores, cliente_id))
-            conn.commit()
-            conn.close()
+                # Actualizar los datos en la base de datos si nadie modificó el cliente desde otra computadora
+                version = reservar_version(cursor, cliente_id, self.almacen.version(cliente_id))
+                cursor.execute("""
+                    UPDATE clientes
+                    SET vacas = ?, proximo_cambio_pezoneras = ?, proximo_cambio_pulsadores = ?
+                    WHERE id = ?
+                """, (vacas, proximo_cambio_pezoneras, proximo_cambio_pulsadores, cliente_id))
+                actualizar_vida_util(cursor, self.reglas, [cliente_id])  # Si hay ordeñes importados, mandan ellos.
+                return version
 
-            # Recargar los datos en la tabla
-            self.load_data()
+            try:
+                version = self.escribir_cliente(cliente_id, guardar)
+            except ConflictoVersion as e:
+                self.avisar_conflicto(e)
+                return
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Ocurrió un error al modificar el cliente: {str(e)}")
+                return
+            if version is None:
+                QMessageBox.warning(self, "Error", "Cliente no encontrado.")
+                return
+            # Recargar solo este cliente (la base pudo ajustar las fechas con los ordeñes importados)
+            self.recargar_clientes([cliente_id])
             QMessageBox.information(self, "Éxito", "Cantidad de vacas actualizada correctamente.")
 
     def modify_ordenes(self, cliente_id):
@@ -806,54 +3165,49 @@ class ClienteApp(QWidget):
         ordenes, ok = QInputDialog.getInt(self, "Modificar Ordeñes", "Ingrese nueva cantidad de ordeñes:")
 
         if ok:
-            conn = sqlite3.connect("clientes.db")
-            cursor = conn.cursor()
+            def guardar(cursor):
+                # Obtener los datos actuales del cliente
+                cursor.execute("SELECT vacas, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo FROM clientes WHERE id = ?", (cliente_id,))
+                cliente = cursor.fetchone()
+                if not cliente:
+                    return None
 
-            # Obtener los datos actuales del cliente
-            cursor.execute("SELECT vacas, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo FROM clientes WHERE id = ?", (cliente_id,))
-            cliente = cursor.fetchone()
-            if not cliente:
-                QMessageBox.warning(self, "Error", "Cliente no encontrado.")
-                conn.close()
-                return
+                vacas, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo = cliente
 
-            vacas, bajadas, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo = cliente
+                # Recalcular el próximo cambio de pezoneras
+                proximo_cambio_pezoneras = self.reglas.proxima_fecha("pezoneras", cliente_id, ultimo_cambio_pezoneras,
+                                                                     vacas, ordenes, bajadas)
 
-            # Recalcular el próximo cambio de pezoneras
-            if ultimo_cambio_pezoneras and vacas > 0 and ordenes > 0 and bajadas > 0 and ultimo_cambio_pezoneras != "Sin datos":
-                dias_adicionales_pezoneras = 2500 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_cambio_pezoneras = datetime.strptime(ultimo_cambio_pezoneras, "%Y-%m-%d")
-                proximo_cambio_pezoneras = (fecha_ultimo_cambio_pezoneras + timedelta(days=int(dias_adicionales_pezoneras))).strftime("%Y-%m-%d")
-            else:
-                proximo_cambio_pezoneras = "Sin datos"
-
-            # Recalcular el próximo cambio de pulsadores
-            if ultimo_cambio_pulsadores and vacas > 0 and ordenes > 0 and bajadas > 0 and ultimo_cambio_pulsadores != "Sin datos":
-                dias_adicionales_pulsadores = 7000 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_cambio_pulsadores = datetime.strptime(ultimo_cambio_pulsadores, "%Y-%m-%d")
-                proximo_cambio_pulsadores = (fecha_ultimo_cambio_pulsadores + timedelta(days=int(dias_adicionales_pulsadores))).strftime("%Y-%m-%d")
-            else:
-                proximo_cambio_pulsadores = "Sin datos"
+                # Recalcular el próximo cambio de pulsadores
+                proximo_cambio_pulsadores = self.reglas.proxima_fecha("pulsadores", cliente_id, ultimo_cambio_pulsadores,
+                                                                      vacas, ordenes, bajadas)
 
-            # Recalcular el próximo chequeo
-            if ultimo_chequeo and vacas > 0 and ordenes > 0 and bajadas > 0 and ultimo_chequeo != "Sin datos":
-                dias_adicionales_chequeo = 7000 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_chequeo = datetime.strptime(ultimo_chequeo, "%Y-%m-%d")
-                proximo_chequeo = (fecha_ultimo_chequeo + timedelta(days=int(dias_adicionales_chequeo))).strftime("%Y-%m-%d")
-            else:
-                proximo_chequeo = "Sin datos"
+                # Recalcular el próximo chequeo
+                proximo_chequeo = self.reglas.proxima_fecha("chequeo", cliente_id, ultimo_chequeo, vacas, ordenes, bajadas)
 
-            # Actualizar los datos en la base de datos
-            cursor.execute("""
-                UPDATE clientes
-                SET ordenes = ?, proximo_cambio_pezoneras = ?, proximo_cambio_pulsadores = ?, proximo_chequeo = ?
-                WHERE id = ?
-            """, (ordenes, proximo_cambio_pezoneras, proximo_cambio_pulsadores, proximo_chequeo, cliente_id))
-            conn.commit()
-            conn.close()
+                # Actualizar los datos en la base de datos si nadie modificó el cliente desde otra computadora
+                version = reservar_version(cursor, cliente_id, self.almacen.version(cliente_id))
+                cursor.execute("""
+                    UPDATE clientes
+                    SET ordenes = ?, proximo_cambio_pezoneras = ?, proximo_cambio_pulsadores = ?, proximo_chequeo = ?
+                    WHERE id = ?
+                """, (ordenes, proximo_cambio_pezoneras, proximo_cambio_pulsadores, proximo_chequeo, cliente_id))
+                actualizar_vida_util(cursor, self.reglas, [cliente_id])  # Si hay ordeñes importados, mandan ellos.
+                return version
 
-            # Recargar los datos en la tabla
-            self.load_data()
+            try:
+                version = self.escribir_cliente(cliente_id, guardar)
+            except ConflictoVersion as e:
+                self.avisar_conflicto(e)
+                return
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Ocurrió un error al modificar el cliente: {str(e)}")
+                return
+            if version is None:
+                QMessageBox.warning(self, "Error", "Cliente no encontrado.")
+                return
+            # Recargar solo este cliente (la base pudo ajustar las fechas con los ordeñes importados)
+            self.recargar_clientes([cliente_id])
             QMessageBox.information(self, "Éxito", "Cantidad de ordeñes actualizada correctamente.")
 
     def modify_bajadas(self, cliente_id):
@@ -861,55 +3215,378 @@ class ClienteApp(QWidget):
         bajadas, ok = QInputDialog.getInt(self, "Modificar Bajadas", "Ingrese nueva cantidad de bajadas:")
 
         if ok:
-            conn = sqlite3.connect("clientes.db")
-            cursor = conn.cursor()
+            def guardar(cursor):
+                # Obtener los datos actuales del cliente
+                cursor.execute("SELECT vacas, ordenes, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo FROM clientes WHERE id = ?", (cliente_id,))
+                cliente = cursor.fetchone()
+                if not cliente:
+                    return None
+
+                vacas, ordenes, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo = cliente
+
+                # Recalcular el próximo cambio de pezoneras
+                proximo_cambio_pezoneras = self.reglas.proxima_fecha("pezoneras", cliente_id, ultimo_cambio_pezoneras,
+                                                                     vacas, ordenes, bajadas)
 
-            # Obtener los datos actuales del cliente
-            cursor.execute("SELECT vacas, ordenes, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo FROM clientes WHERE id = ?", (cliente_id,))
-            cliente = cursor.fetchone()
-            if not cliente:
+                # Recalcular el próximo cambio de pulsadores
+                proximo_cambio_pulsadores = self.reglas.proxima_fecha("pulsadores", cliente_id, ultimo_cambio_pulsadores,
+                                                                      vacas, ordenes, bajadas)
+
+                # Recalcular el próximo chequeo
+                proximo_chequeo = self.reglas.proxima_fecha("chequeo", cliente_id, ultimo_chequeo, vacas, ordenes, bajadas)
+
+                # Actualizar los datos en la base de datos si nadie modificó el cliente desde otra computadora
+                version = reservar_version(cursor, cliente_id, self.almacen.version(cliente_id))
+                cursor.execute("""
+                    UPDATE clientes
+                    SET bajadas = ?, proximo_cambio_pezoneras = ?, proximo_cambio_pulsadores = ?, proximo_chequeo = ?
+                    WHERE id = ?
+                """, (bajadas, proximo_cambio_pezoneras, proximo_cambio_pulsadores, proximo_chequeo, cliente_id))
+                actualizar_vida_util(cursor, self.reglas, [cliente_id])  # Si hay ordeñes importados, mandan ellos.
+                return version
+
+            try:
+                version = self.escribir_cliente(cliente_id, guardar)
+            except ConflictoVersion as e:
+                self.avisar_conflicto(e)
+                return
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Ocurrió un error al modificar el cliente: {str(e)}")
+                return
+            if version is None:
                 QMessageBox.warning(self, "Error", "Cliente no encontrado.")
-                conn.close()
                 return
+            # Recargar solo este cliente (la base pudo ajustar las fechas con los ordeñes importados)
+            self.recargar_clientes([cliente_id])
+            QMessageBox.information(self, "Éxito", "Cantidad de bajadas actualizada correctamente.")
 
-            vacas, ordenes, ultimo_cambio_pezoneras, ultimo_cambio_pulsadores, ultimo_chequeo = cliente
+    def iniciar_ingesta_ordenie(self):
+        """Crea la carpeta de exportaciones, la vigila e importa los archivos pendientes"""
+        os.makedirs(CARPETA_ORDENIE, exist_ok=True)
+        self.hilo_ingesta = None
+        self.ingesta_pendiente = False
+        self.watcher_ordenie = QFileSystemWatcher([CARPETA_ORDENIE], self)
+        self.watcher_ordenie.directoryChanged.connect(lambda _: self.importar_ordenie(silencioso=True))
+        # Vuelve a revisar la carpeta cuando los archivos que se estaban copiando quedan quietos.
+        self.timer_ingesta = QTimer(self)
+        self.timer_ingesta.setSingleShot(True)
+        self.timer_ingesta.timeout.connect(lambda: self.importar_ordenie(silencioso=True))
+        self.importar_ordenie(silencioso=True)
+
+    def importar_ordenie(self, silencioso=False):
+        """Importa en segundo plano los archivos nuevos de la carpeta de exportaciones"""
+        if self.hilo_ingesta is not None and self.hilo_ingesta.isRunning():
+            self.ingesta_pendiente = True  # Se vuelve a revisar la carpeta al terminar.
+            return
 
-            # Recalcular el próximo cambio de pezoneras
-            if ultimo_cambio_pezoneras and vacas > 0 and ordenes > 0 and bajadas > 0 and ultimo_cambio_pezoneras != "Sin datos":
-                dias_adicionales_pezoneras = 2500 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_cambio_pezoneras = datetime.strptime(ultimo_cambio_pezoneras, "%Y-%m-%d")
-                proximo_cambio_pezoneras = (fecha_ultimo_cambio_pezoneras + timedelta(days=int(dias_adicionales_pezoneras))).strftime("%Y-%m-%d")
-            else:
-                proximo_cambio_pezoneras = "Sin datos"
+        self.ingesta_pendiente = False
+        self.hilo_ingesta = HiloIngestaOrdenie(self.reglas, self)
+        self.hilo_ingesta.terminado.connect(
+            lambda archivos, sesiones, pendientes, errores:
+            self.ingesta_terminada(archivos, sesiones, pendientes, errores, silencioso))
+        self.hilo_ingesta.fallo.connect(lambda error: self.ingesta_fallida(error, silencioso))
+        self.hilo_ingesta.start()
+
+    def ingesta_fallida(self, error, silencioso):
+        """Avisa que no se pudo revisar la carpeta (en las revisiones automáticas no se interrumpe al usuario)"""
+        if not silencioso:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al importar los ordeñes: {error}")
+        if self.ingesta_pendiente:
+            self.importar_ordenie(silencioso=True)
+
+    def ingesta_terminada(self, archivos, sesiones, pendientes, errores, silencioso):
+        """Refresca la tabla y los avisos después de importar exportaciones"""
+        if archivos:
+            self.load_data()
+            self.alertas.cargar()
+        if pendientes:
+            self.timer_ingesta.start(ESPERA_ARCHIVO_ESTABLE * 1000)
+        if not silencioso:
+            mensaje = f"Se importaron {archivos} archivo(s) con {sesiones} sesión(es) de ordeñe."
+            if pendientes:
+                mensaje += f"\n{pendientes} archivo(s) todavía se están copiando: se importarán al terminar."
+            if errores:
+                mensaje += "\nNo se pudieron leer:\n" + "\n".join(errores)
+            QMessageBox.information(self, "Importar Ordeñes", mensaje)
+        if self.ingesta_pendiente:
+            self.importar_ordenie(silencioso=True)
+
+    def select_cliente_para_ubicacion(self):
+        """Permite seleccionar un cliente y cargar sus coordenadas"""
+        conn = conectar_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, nombre, latitud, longitud FROM clientes ORDER BY nombre ASC")
+            clientes = cursor.fetchall()
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al leer los clientes: {str(e)}")
+            return
+        finally:
+            conn.close()
 
-            # Recalcular el próximo cambio de pulsadores
-            if ultimo_cambio_pulsadores and vacas > 0 and ordenes > 0 and bajadas > 0 and ultimo_cambio_pulsadores != "Sin datos":
-                dias_adicionales_pulsadores = 7000 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_cambio_pulsadores = datetime.strptime(ultimo_cambio_pulsadores, "%Y-%m-%d")
-                proximo_cambio_pulsadores = (fecha_ultimo_cambio_pulsadores + timedelta(days=int(dias_adicionales_pulsadores))).strftime("%Y-%m-%d")
-            else:
-                proximo_cambio_pulsadores = "Sin datos"
+        cliente_names = [cliente[1] for cliente in clientes]
+        cliente, ok = QInputDialog.getItem(self, "Seleccionar Cliente", "Seleccione un cliente:", cliente_names, 0, False)
+        if not ok or not cliente:
+            return
 
-            # Recalcular el próximo chequeo
-            if ultimo_chequeo and vacas > 0 and ordenes > 0 and bajadas > 0 and ultimo_chequeo != "Sin datos":
-                dias_adicionales_chequeo = 7000 / (vacas * (ordenes / bajadas))
-                fecha_ultimo_chequeo = datetime.strptime(ultimo_chequeo, "%Y-%m-%d")
-                proximo_chequeo = (fecha_ultimo_chequeo + timedelta(days=int(dias_adicionales_chequeo))).strftime("%Y-%m-%d")
-            else:
-                proximo_chequeo = "Sin datos"
+        id_cliente, _, latitud, longitud = clientes[cliente_names.index(cliente)]
+        actual = f"{latitud}, {longitud}" if latitud is not None and longitud is not None else ""
+        texto, ok = QInputDialog.getText(self, "Ubicación del Cliente",
+                                         "Coordenadas (latitud, longitud); vacío para borrar:", text=actual)
+        if not ok:
+            return
 
-            # Actualizar los datos en la base de datos
-            cursor.execute("""
-                UPDATE clientes
-                SET bajadas = ?, proximo_cambio_pezoneras = ?, proximo_cambio_pulsadores = ?, proximo_chequeo = ?
-                WHERE id = ?
-            """, (bajadas, proximo_cambio_pezoneras, proximo_cambio_pulsadores, proximo_chequeo, cliente_id))
-            conn.commit()
+        coordenadas = self.leer_coordenadas(texto)
+        if coordenadas is False:
+            return
+
+        def guardar(cursor):
+            cursor.execute("UPDATE clientes SET latitud = ?, longitud = ?, version = version + 1 WHERE id = ?",
+                           (*(coordenadas or (None, None)), id_cliente))
+            cursor.execute("SELECT version FROM clientes WHERE id = ?", (id_cliente,))
+            fila = cursor.fetchone()
+            return fila[0] if fila else None
+
+        try:
+            version = ejecutar_con_reintentos(guardar)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al actualizar la ubicación: {str(e)}")
+            return
+        # La tabla no muestra las coordenadas, pero la versión en memoria tiene que seguir a la de la base: si no,
+        # la próxima modificación del cliente se tomaría como un conflicto. Solo si nadie más lo cambió en el medio.
+        cliente = self.almacen.clientes.get(id_cliente)
+        if cliente is not None and version == cliente.version + 1:
+            cliente.version = version
+        QMessageBox.information(self, "Éxito", "Ubicación actualizada correctamente.")
+
+    def leer_coordenadas(self, texto):
+        """Convierte "latitud, longitud" en una tupla; None si está vacío y False si es inválido"""
+        if not texto.strip():
+            return None
+        try:
+            latitud, longitud = (float(valor) for valor in texto.split(","))
+            if not -90 <= latitud <= 90 or not -180 <= longitud <= 180:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Las coordenadas deben tener el formato 'latitud, longitud'.")
+            return False
+        return latitud, longitud
+
+    def planificar_ruta(self):
+        """Arma la ruta del día con los clientes vencidos o por vencer que tienen ubicación"""
+        dias, ok = QInputDialog.getInt(self, "Planificar Ruta", "Incluir vencimientos de los próximos días:",
+                                       UMBRALES_ALERTA[0], 0, 365)
+        if not ok:
+            return
+
+        conn = conectar_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT valor FROM configuracion WHERE clave = 'origen_ruta'")
+            fila = cursor.fetchone()
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al planificar la ruta: {str(e)}")
+            return
+        finally:
             conn.close()
 
-            # Recargar los datos en la tabla
-            self.load_data()
-            QMessageBox.information(self, "Éxito", "Cantidad de bajadas actualizada correctamente.")
+        texto, ok = QInputDialog.getText(self, "Planificar Ruta",
+                                         "Punto de partida (latitud, longitud); vacío para salir del más urgente:",
+                                         text=fila[0] if fila else "")
+        if not ok:
+            return
+        origen = self.leer_coordenadas(texto)
+        if origen is False:
+            return
+
+        try:
+            ejecutar_con_reintentos(lambda cursor: cursor.execute(
+                "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES ('origen_ruta', ?)", (texto.strip(),)))
+
+            conn = conectar_db()
+            try:
+                cursor = conn.cursor()
+                # Agrupar los vencimientos por cliente (ya vienen ordenados por fecha).
+                paradas = {}
+                for id_cliente, nombre, componente, fecha in consultar_vencimientos(cursor, dias):
+                    parada = paradas.setdefault(id_cliente, {"nombre": nombre, "fecha": fecha, "componentes": []})
+                    parada["componentes"].append(componente)
+
+                ubicaciones = {}
+                if paradas:
+                    cursor.execute(f"""
+                        SELECT id, latitud, longitud FROM clientes
+                        WHERE id IN ({', '.join('?' * len(paradas))}) AND latitud IS NOT NULL AND longitud IS NOT NULL
+                    """, list(paradas))
+                    ubicaciones = {id_cliente: (latitud, longitud) for id_cliente, latitud, longitud in cursor.fetchall()}
+            finally:
+                conn.close()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al planificar la ruta: {str(e)}")
+            return
+
+        ids = [id_cliente for id_cliente in paradas if id_cliente in ubicaciones]
+        sin_ubicacion = len(paradas) - len(ids)
+        if not ids:
+            QMessageBox.information(self, "Planificar Ruta",
+                                    f"No hay clientes con ubicación para visitar ({sin_ubicacion} sin ubicación).")
+            return
+
+        # El primer punto de la ruta es el origen o, si no hay, el cliente más urgente.
+        puntos = ([origen] if origen else []) + [ubicaciones[id_cliente] for id_cliente in ids]
+        orden = ordenar_ruta(puntos)
+        if origen:
+            orden = [indice - 1 for indice in orden[1:]]
+
+        filas = []
+        anterior = origen
+        acumulado = 0.0
+        for numero, indice in enumerate(orden, start=1):
+            id_cliente = ids[indice]
+            parada = paradas[id_cliente]
+            tramo = distancia_km(*anterior, *ubicaciones[id_cliente]) if anterior else 0.0
+            acumulado += tramo
+            anterior = ubicaciones[id_cliente]
+            filas.append([str(numero), parada["nombre"], ", ".join(parada["componentes"]), parada["fecha"],
+                          f"{tramo:.1f}", f"{acumulado:.1f}"])
+        if origen:
+            regreso = distancia_km(*anterior, *origen)
+            filas.append(["", "Regreso al punto de partida", "", "", f"{regreso:.1f}", f"{acumulado + regreso:.1f}"])
+
+        dialogo = QDialog(self)
+        dialogo.setWindowTitle(f"Ruta del Día ({len(ids)} paradas, {sin_ubicacion} sin ubicación)")
+        dialogo.resize(900, 500)
+        dialogo_layout = QVBoxLayout()
+        encabezados = ["Orden", "Cliente", "Componentes", "Vence", "Km tramo", "Km acumulados"]
+        tabla = QTableWidget(len(filas), len(encabezados))
+        tabla.setHorizontalHeaderLabels(encabezados)
+        tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        for row_idx, fila in enumerate(filas):
+            for col_idx, valor in enumerate(fila):
+                tabla.setItem(row_idx, col_idx, QTableWidgetItem(valor))
+        dialogo_layout.addWidget(tabla)
+        dialogo.setLayout(dialogo_layout)
+        dialogo.exec()
+
+    def mostrar_pronostico(self):
+        """Muestra los repuestos necesarios por semana para los próximos meses"""
+        meses, ok = QInputDialog.getInt(self, "Pronóstico de Repuestos", "Cantidad de meses:", 1, 1, 36)
+        if not ok:
+            return
+
+        try:
+            semanas, demanda = pronosticar_demanda(self.reglas, meses)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al calcular el pronóstico: {str(e)}")
+            return
+
+        encabezados = ["Semana"] + [nombre for nombre, _ in REPUESTOS_POR_CAMBIO.values()]
+        filas = [[lunes.strftime("%Y-%m-%d")] + [demanda[componente][indice] for componente in REPUESTOS_POR_CAMBIO]
+                 for indice, lunes in enumerate(semanas)]
+        filas.append(["Total"] + [sum(demanda[componente]) for componente in REPUESTOS_POR_CAMBIO])
+
+        dialogo = QDialog(self)
+        dialogo.setWindowTitle(f"Pronóstico de Repuestos ({meses} mes/es)")
+        dialogo.resize(700, 500)
+        dialogo_layout = QVBoxLayout()
+
+        tabla = QTableWidget(len(filas), len(encabezados))
+        tabla.setHorizontalHeaderLabels(encabezados)
+        tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        for row_idx, fila in enumerate(filas):
+            for col_idx, valor in enumerate(fila):
+                item = QTableWidgetItem(str(valor))
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                tabla.setItem(row_idx, col_idx, item)
+        dialogo_layout.addWidget(tabla)
+
+        exportar_button = QPushButton("Exportar CSV")
+        exportar_button.clicked.connect(lambda: self.exportar_pronostico(encabezados, filas))
+        dialogo_layout.addWidget(exportar_button)
+
+        dialogo.setLayout(dialogo_layout)
+        dialogo.exec()
+
+    def exportar_pronostico(self, encabezados, filas):
+        """Guarda el pronóstico de repuestos en un archivo CSV"""
+        ruta, _ = QFileDialog.getSaveFileName(self, "Exportar Pronóstico", "pronostico_repuestos.csv", "CSV (*.csv)")
+        if not ruta:
+            return
+        try:
+            with open(ruta, "w", newline="", encoding="utf-8-sig") as archivo:
+                escritor = csv.writer(archivo, delimiter=";")
+                escritor.writerow(encabezados)
+                escritor.writerows(filas)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al exportar el pronóstico: {str(e)}")
+            return
+        QMessageBox.information(self, "Éxito", "Pronóstico exportado correctamente.")
+
+    def mostrar_consolidado(self):
+        """Muestra el resumen y los vencimientos de todas las bases de distribuidores de una carpeta"""
+        carpeta = QFileDialog.getExistingDirectory(self, "Carpeta de Bases de Distribuidores")
+        if not carpeta:
+            return
+        dias, ok = QInputDialog.getInt(self, "Modo Consolidado", "Incluir vencimientos de los próximos días:",
+                                       UMBRALES_ALERTA[0], 0, 365)
+        if not ok:
+            return
+
+        try:
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            try:
+                resumenes, (total, total_vacas), vencimientos, errores = consolidar_distribuidores(carpeta, dias)
+                vencimientos = list(vencimientos)
+            finally:
+                QApplication.restoreOverrideCursor()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al consolidar las bases: {str(e)}")
+            return
+        if not resumenes and not errores:
+            QMessageBox.information(self, "Modo Consolidado", "No se encontraron bases de datos (.db) en la carpeta.")
+            return
+
+        # Una fila por distribuidor y una de totales: vencidos / por vencer de cada componente.
+        encabezados = ["Distribuidor", "Vacas"] + [f"{componente.capitalize()} (venc./prox.)" for componente in COMPONENTES]
+        filas = [[distribuidor, vacas] + [f"{resumen[c]['vencido']} / {resumen[c]['por_vencer']}" for c in COMPONENTES]
+                 for distribuidor, (resumen, vacas) in sorted(resumenes.items())]
+        filas.append(["Total", total_vacas] + [f"{total[c]['vencido']} / {total[c]['por_vencer']}" for c in COMPONENTES])
+
+        dialogo = QDialog(self)
+        dialogo.setWindowTitle(f"Modo Consolidado ({len(resumenes)} distribuidores, {len(vencimientos)} vencimientos)")
+        dialogo.resize(900, 600)
+        dialogo_layout = QVBoxLayout()
+
+        tabla_resumen = QTableWidget(len(filas), len(encabezados))
+        tabla_resumen.setHorizontalHeaderLabels(encabezados)
+        tabla_resumen.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        tabla_resumen.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        for row_idx, fila in enumerate(filas):
+            for col_idx, valor in enumerate(fila):
+                item = QTableWidgetItem(str(valor))
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                tabla_resumen.setItem(row_idx, col_idx, item)
+        dialogo_layout.addWidget(tabla_resumen)
+
+        tabla_vencimientos = QTableWidget(len(vencimientos), 4)
+        tabla_vencimientos.setHorizontalHeaderLabels(["Fecha", "Distribuidor", "Cliente", "Componente"])
+        tabla_vencimientos.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        tabla_vencimientos.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        for row_idx, (fecha, distribuidor, nombre, componente) in enumerate(vencimientos):
+            for col_idx, valor in enumerate((fecha, distribuidor, nombre, componente.capitalize())):
+                tabla_vencimientos.setItem(row_idx, col_idx, QTableWidgetItem(valor))
+            dias_restantes = (datetime.strptime(fecha, "%Y-%m-%d") - datetime.now()).days
+            self.colorear_celda(tabla_vencimientos.item(row_idx, 0), dias_restantes)
+        dialogo_layout.addWidget(tabla_vencimientos)
+
+        if errores:
+            detalle = "\n".join(f"{distribuidor}: {error}" for distribuidor, error in sorted(errores.items()))
+            dialogo_layout.addWidget(QLabel(f"No se pudieron leer {len(errores)} bases:\n{detalle}"))
+
+        dialogo.setLayout(dialogo_layout)
+        dialogo.exec()
 
     def colorear_celda(self, item, dias_restantes):
         """Colorea una celda según los días restantes"""
@@ -934,49 +3611,250 @@ class ClienteApp(QWidget):
             QMessageBox.critical(self, "Error", f"Ocurrió un error al guardar los datos: {str(e)}")
 
     def save_all_data(self):
-        """Guarda todos los datos de la tabla en la base de datos"""
-        conn = sqlite3.connect("clientes.db")
-        cursor = conn.cursor()
+        """Guarda en la base de datos los cambios de mangueras de los clientes en memoria"""
+        filas = [(escribir_fecha(cliente.ultimo_cambio), escribir_fecha(cliente.proximo_cambio_mangueras),
+                  cliente.id, cliente.version,
+                  escribir_fecha(cliente.ultimo_cambio), escribir_fecha(cliente.proximo_cambio_mangueras))
+                 for cliente in self.almacen.clientes.values()]
+
+        # Guardar los datos en la base de datos. Solo se escriben las filas que cambiaron y que nadie
+        # modificó desde otra computadora: así una tabla desactualizada no pisa datos más nuevos.
+        # En memoria una fecha vacía y "Sin datos" son lo mismo (None): no cuentan como cambio.
+        def guardar(cursor):
+            cursor.executemany("""
+                UPDATE clientes 
+                SET ultimo_cambio = ?, proximo_cambio_mangueras = ?, version = version + 1
+                WHERE id = ? AND version = ?
+                  AND (IFNULL(ultimo_cambio, 'Sin datos') IS NOT ?
+                       OR IFNULL(proximo_cambio_mangueras, 'Sin datos') IS NOT ?)
+            """, filas)
+
+        ejecutar_con_reintentos(guardar)
+
+    def sincronizar(self):
+        """Intercambia los cambios con otra base de datos mediante archivos o el servicio de la oficina"""
+        opciones = ["Exportar cambios a archivo", "Importar cambios de archivo", "Sincronizar con servidor"]
+        opcion, ok = QInputDialog.getItem(self, "Sincronizar", "Seleccione una opción:", opciones, 0, False)
+        if not ok:
+            return
 
-        for row_idx in range(self.table.rowCount()):
-            try:
-                # Validar que los elementos existen antes de acceder a ellos
-                id_cliente_item = self.table.item(row_idx, 0)
-                id_cliente = id_cliente_item.data(Qt.ItemDataRole.UserRole) if id_cliente_item else None
+        try:
+            if opcion == opciones[0]:
+                conn = conectar_db()
+                cursor = conn.cursor()
+                cursor.execute("SELECT id_instancia, ultima_sincronizacion FROM pares_sincronizacion ORDER BY 2 DESC")
+                pares = cursor.fetchall()
+                conn.close()
 
-                ultimo_cambio_item = self.table.item(row_idx, 7)
-                ultimo_cambio = ultimo_cambio_item.text() if ultimo_cambio_item else "Sin datos"
+                destinos = ["Nuevo destino (todos los cambios)"] + [f"{par} (última: {fecha})" for par, fecha in pares]
+                destino, ok = QInputDialog.getItem(self, "Exportar Cambios", "Destino:", destinos, 0, False)
+                if not ok:
+                    return
+                id_destino = None if destino == destinos[0] else pares[destinos.index(destino) - 1][0]
+
+                ruta, _ = QFileDialog.getSaveFileName(self, "Exportar Cambios", "cambios.sync.gz",
+                                                      "Sincronización (*.sync.gz)")
+                if not ruta:
+                    return
+                cantidad = exportar_cambios(ruta, id_destino)
+                QMessageBox.information(self, "Éxito", f"Se exportaron {cantidad} cambio(s).")
+                return
 
-                proximo_cambio_item = self.table.item(row_idx, 8)
-                proximo_cambio_mangueras = proximo_cambio_item.text() if proximo_cambio_item else "Sin datos"
+            if opcion == opciones[1]:
+                ruta, _ = QFileDialog.getOpenFileName(self, "Importar Cambios", "", "Sincronización (*.sync.gz)")
+                if not ruta:
+                    return
+                mensaje = f"Se aplicaron {importar_cambios(ruta)} cambio(s)."
+            else:
+                conn = conectar_db()
+                fila = conn.execute("SELECT valor FROM configuracion WHERE clave = 'servidor_sync'").fetchone()
+                conn.close()
+                url, ok = QInputDialog.getText(self, "Sincronizar con Servidor", "Dirección del servidor:",
+                                               text=fila[0] if fila else "http://oficina:8765")
+                if not ok or not url.strip():
+                    return
+                ejecutar_con_reintentos(lambda cursor: cursor.execute(
+                    "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES ('servidor_sync', ?)", (url.strip(),)))
+
+                conn = conectar_db()
+                fila = conn.execute("SELECT valor FROM configuracion WHERE clave = 'clave_sync'").fetchone()
+                conn.close()
+                if fila:
+                    clave = fila[0]
+                else:
+                    # La clave la muestra el servicio de la oficina al iniciar.
+                    clave, ok = QInputDialog.getText(self, "Sincronizar con Servidor", "Clave de sincronización:",
+                                                     QLineEdit.EchoMode.Password)
+                    if not ok or not clave.strip():
+                        return
+                    clave = clave.strip()
+                    ejecutar_con_reintentos(lambda cursor: cursor.execute(
+                        "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES ('clave_sync', ?)", (clave,)))
+                enviados, recibidos = sincronizar_con_servidor(url.strip(), clave)
+                mensaje = f"Se enviaron {enviados} cambio(s) y se aplicaron {recibidos}."
+        except PermissionError as e:
+            # Clave equivocada: se olvida para volver a pedirla la próxima vez.
+            ejecutar_con_reintentos(lambda cursor: cursor.execute("DELETE FROM configuracion WHERE clave = 'clave_sync'"))
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al sincronizar: {str(e)}")
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al sincronizar: {str(e)}")
+            return
 
-                # Guardar los datos en la base de datos
-                cursor.execute("""
-                    UPDATE clientes 
-                    SET ultimo_cambio = ?, proximo_cambio_mangueras = ? 
-                    WHERE id = ?
-                """, (ultimo_cambio, proximo_cambio_mangueras, id_cliente))
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Ocurrió un error al guardar los datos: {str(e)}")
+        self.load_data()
+        self.alertas.cargar()
+        QMessageBox.information(self, "Éxito", mensaje)
+
+    def avisar_conflicto(self, error):
+        """Informa que otra computadora modificó el cliente y muestra los datos actuales"""
+        QMessageBox.warning(self, "Datos desactualizados", f"{error}\nSe actualizaron los datos; vuelva a intentarlo.")
+        self.refrescar_cambios_externos()
+
+    def iniciar_respaldos(self):
+        """Programa los respaldos periódicos y hace uno enseguida si el último es demasiado viejo"""
+        self.hilo_respaldo = None
+        self.timer_respaldo = QTimer(self)
+        self.timer_respaldo.timeout.connect(lambda: self.respaldar(silencioso=True))
+        self.timer_respaldo.start(INTERVALO_RESPALDO_MS)
+        respaldos = listar_respaldos()
+        if not respaldos or datetime.now() - respaldos[0][0] > timedelta(milliseconds=INTERVALO_RESPALDO_MS):
+            self.respaldar(silencioso=True)
+
+    def respaldar(self, silencioso=False):
+        """Crea un respaldo en segundo plano"""
+        if self.hilo_respaldo is not None and self.hilo_respaldo.isRunning():
+            return  # Ya hay un respaldo en curso.
+
+        self.hilo_respaldo = HiloRespaldo(self)
+        if not silencioso:
+            self.hilo_respaldo.terminado.connect(
+                lambda ruta: QMessageBox.information(self, "Respaldos", f"Respaldo creado en {ruta}."))
+        self.hilo_respaldo.fallo.connect(
+            lambda error: QMessageBox.critical(self, "Error", f"Ocurrió un error al crear el respaldo: {error}"))
+        self.hilo_respaldo.start()
+
+    def gestionar_respaldos(self):
+        """Permite crear un respaldo en el momento o restaurar uno anterior"""
+        opciones = ["Crear respaldo ahora", "Restaurar respaldo"]
+        opcion, ok = QInputDialog.getItem(self, "Respaldos", "Seleccione una opción:", opciones, 0, False)
+        if not ok:
+            return
+        if opcion == opciones[0]:
+            self.respaldar()
+            return
 
-        conn.commit()
-        conn.close()
+        respaldos = listar_respaldos()
+        if not respaldos:
+            QMessageBox.information(self, "Respaldos", "Todavía no hay respaldos.")
+            return
+        nombres = [fecha.strftime("%Y-%m-%d %H:%M:%S") for fecha, _ in respaldos]
+        elegido, ok = QInputDialog.getItem(self, "Restaurar Respaldo", "Seleccione el respaldo:", nombres, 0, False)
+        if not ok:
+            return
+        if self.hilo_respaldo is not None and self.hilo_respaldo.isRunning():
+            QMessageBox.warning(self, "Respaldos", "Hay un respaldo en curso. Intente de nuevo en unos segundos.")
+            return
+        confirmacion = QMessageBox.question(
+            self, "Restaurar Respaldo",
+            f"Se reemplazarán todos los datos por los del {elegido}. Antes se guardará un respaldo del estado actual. ¿Continuar?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if confirmacion != QMessageBox.StandardButton.Yes:
+            return
 
-    def create_marcar_cambio_pezoneras_handler(self, id_cliente, row_idx):
+        try:
+            seguridad = restaurar_respaldo(respaldos[nombres.index(elegido)][1])
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error al restaurar el respaldo: {str(e)}")
+            return
+        self.reglas.cargar()
+        self.load_data()
+        self.alertas.cargar()
+        QMessageBox.information(self, "Respaldos", f"Respaldo restaurado. El estado anterior quedó guardado en {seguridad}.")
+
+    def iniciar_vigilancia_db(self):
+        """Abre la conexión que detecta cambios hechos por otras instancias sobre la misma base de datos"""
+        self.conn_vigilancia = conectar_db()
+        self.data_version = self.conn_vigilancia.execute("PRAGMA data_version").fetchone()[0]
+        self.timer_vigilancia = QTimer(self)
+        self.timer_vigilancia.timeout.connect(self.revisar_cambios_externos)
+        self.timer_vigilancia.start(INTERVALO_VIGILANCIA_MS)
+
+    def revisar_cambios_externos(self):
+        """Consulta `PRAGMA data_version` (no lee datos) y refresca la tabla si la base cambió"""
+        try:
+            data_version = self.conn_vigilancia.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.OperationalError:
+            return  # Base bloqueada por otra instancia: se revisa en la próxima vuelta.
+        if data_version != self.data_version:
+            try:
+                self.refrescar_cambios_externos()
+                self.recargar_resumen()
+                self.reglas.cargar()  # Otra computadora pudo archivar o restaurar clientes con reglas propias.
+            except sqlite3.OperationalError:
+                return  # Bloqueada a mitad de la lectura: sin guardar data_version, se reintenta en la próxima vuelta.
+            self.data_version = data_version
+
+    def refrescar_cambios_externos(self):
+        """Vuelve a mostrar solo las filas de los clientes cuya versión cambió"""
+        cursor = self.conn_vigilancia.cursor()
+        # Solo interesan los clientes entre la primera y la última fila cargadas.
+        primera = ultima = None
+        if self.table.rowCount() > 0:
+            if self.hay_anteriores:
+                primera = self.almacen.clave(self.table.item(0, 0).data(Qt.ItemDataRole.UserRole))
+            if self.hay_siguientes:
+                ultima = self.almacen.clave(self.table.item(self.table.rowCount() - 1, 0).data(Qt.ItemDataRole.UserRole))
+        versiones = self.almacen.versiones_en_rango(cursor, primera, ultima)
+
+        # Altas o bajas dentro de lo cargado cambian el orden de las filas: en ese caso se recargan todas.
+        if versiones.keys() != self.almacen.clientes.keys():
+            self.recargar_ventana()
+            self.alertas.cargar()
+            return
+
+        cambiados = [id_cliente for id_cliente, version in versiones.items()
+                     if version != self.almacen.clientes[id_cliente].version]
+        if cambiados:
+            self.recargar_clientes(cambiados, cursor)
+
+    def recargar_clientes(self, ids_clientes, cursor=None):
+        """Vuelve a leer de la base solo los clientes indicados y redibuja sus filas y avisos"""
+        filas = {}
+        for row_idx in range(self.table.rowCount()):
+            item = self.table.item(row_idx, 0)
+            if item is not None:
+                filas[item.data(Qt.ItemDataRole.UserRole)] = row_idx
+
+        conn = None
+        if cursor is None:
+            conn = conectar_db()
+            cursor = conn.cursor()
+        try:
+            actualizados = self.almacen.actualizar(cursor, ids_clientes)
+        finally:
+            if conn is not None:
+                conn.close()
+        for cliente in actualizados:
+            if cliente.id in filas:
+                self.mostrar_fila(filas[cliente.id], cliente)
+        for id_cliente in ids_clientes:
+            self.alertas.actualizar_cliente(id_cliente)
+
+    def create_marcar_cambio_pezoneras_handler(self, id_cliente):
         """Crea un manejador para el botón de marcar cambio de pezoneras"""
-        return lambda: self.marcar_cambio_pezoneras(id_cliente, row_idx)
+        return lambda: self.marcar_cambio_pezoneras(id_cliente, self.fila_cliente(id_cliente))  # Las filas se corren al paginar.
 
-    def create_marcar_cambio_mangueras_handler(self, id_cliente, row_idx):
+    def create_marcar_cambio_mangueras_handler(self, id_cliente):
         """Crea un manejador para el botón de marcar cambio de mangueras"""
-        return lambda: self.marcar_cambio_mangueras(id_cliente, row_idx)
+        return lambda: self.marcar_cambio_mangueras(id_cliente, self.fila_cliente(id_cliente))  # Las filas se corren al paginar.
 
-    def create_marcar_cambio_pulsadores_handler(self, id_cliente, row_idx):
+    def create_marcar_cambio_pulsadores_handler(self, id_cliente):
         """Crea un manejador para el botón de marcar cambio de pulsadores"""
-        return lambda: self.marcar_cambio_pulsadores(id_cliente, row_idx)
+        return lambda: self.marcar_cambio_pulsadores(id_cliente, self.fila_cliente(id_cliente))  # Las filas se corren al paginar.
 
-    def create_marcar_chequeo_handler(self, id_cliente, row_idx):
+    def create_marcar_chequeo_handler(self, id_cliente):
         """Crea un manejador para el botón de marcar chequeo"""
-        return lambda: self.marcar_chequeo(id_cliente, row_idx)
+        return lambda: self.marcar_chequeo(id_cliente, self.fila_cliente(id_cliente))  # Las filas se corren al paginar.
 
 def obtener_version_remota():
     url = "https://raw.githubusercontent.com/Fabrischulz/Control-Tambo/main/version.txt"
@@ -1014,8 +3892,32 @@ def chequear_actualizacion():
         if respuesta == QMessageBox.StandardButton.Yes:
             descargar_nueva_version()
 
+# Función que lee el puerto que sigue a una opción de la línea de comandos
+def puerto_argumento(opcion, por_defecto):
+    """Devuelve el número que sigue a `opcion` o `por_defecto` si no se indicó"""
+    posicion = sys.argv.index(opcion)
+    siguiente = sys.argv[posicion + 1] if len(sys.argv) > posicion + 1 else ""
+    return int(siguiente) if siguiente.isdigit() else por_defecto
+
 if __name__ == "__main__":
     initialize_db()  # Asegura que la base de datos esté configurada correctamente
+    if "--api" in sys.argv:
+        # `TJ.py --api [puerto]` abre además el servicio de consultas; con `--sin-ventana` es lo único que corre.
+        hilo_api = iniciar_api(puerto_argumento("--api", PUERTO_API))
+    if "--servidor-sync" in sys.argv:
+        # Modo servicio: `TJ.py --servidor-sync [puerto] [--direccion IP]` atiende a las computadoras de campo
+        # sin abrir la ventana. La dirección se recuerda para los próximos inicios.
+        direccion = None
+        if "--direccion" in sys.argv and len(sys.argv) > sys.argv.index("--direccion") + 1:
+            direccion = sys.argv[sys.argv.index("--direccion") + 1]
+        servir_sincronizacion(puerto_argumento("--servidor-sync", 8765), direccion)
+        sys.exit(0)
+    if "--api" in sys.argv and "--sin-ventana" in sys.argv:
+        try:
+            hilo_api.join()
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
     app = QApplication(sys.argv)
     window = ClienteApp()
     window.show()
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+import TJ
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """Base de datos vacía en una carpeta temporal, inicializada como al abrir la aplicación"""
+    monkeypatch.setattr(TJ, "RUTA_DB", str(tmp_path / "clientes.db"))
+    conn = sqlite3.connect(TJ.RUTA_DB)
+    conn.execute("CREATE TABLE clientes (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT, vacas INTEGER, "
+                 "ultimo_cambio TEXT, intervalo INTEGER)")
+    conn.commit()
+    conn.close()
+    TJ.initialize_db()
+    return tmp_path
+
+
+def proximo_pezoneras(id_cliente):
+    conn = TJ.conectar_db()
+    try:
+        return conn.execute("SELECT proximo_cambio_pezoneras FROM clientes WHERE id = ?", (id_cliente,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_editar_regla_conserva_fecha_por_uso(base):
+    # 100 vacas, 2 ordeñes, 10 bajadas: 20 ordeñes por unidad y por día; por fecha serían 2500 / 20 = 125 días.
+    conn = TJ.conectar_db()
+    id_cliente = conn.execute("""
+        INSERT INTO clientes (nombre, vacas, ordenes, bajadas, ultimo_cambio, ultimo_cambio_pezoneras)
+        VALUES ('Tambo', 100, 2, 10, '2026-01-01', '2026-01-01')
+    """).lastrowid
+    conn.commit()
+    conn.close()
+
+    # 10110 ordeñes / 10 bajadas = 1011 por unidad: quedan 1489, 74 días contados desde la última sesión.
+    exportacion = base / "sesiones.csv"
+    exportacion.write_text("id_cliente,fecha,ordenes_unidad\n"
+                           f"{id_cliente},2026-06-01,10110\n", encoding="utf-8")
+    reglas = TJ.MotorReglas()
+    reglas.cargar()
+    assert TJ.importar_archivo_ordenie(str(exportacion), reglas) == 1
+    assert proximo_pezoneras(id_cliente) == "2026-08-14"
+
+    reglas.guardar_regla("pezoneras", "uso", {"constante": 2500})
+    assert proximo_pezoneras(id_cliente) == "2026-08-14"
+
+    reglas.guardar_regla("pezoneras", "uso", {"constante": 3000}, id_cliente)
+    assert proximo_pezoneras(id_cliente) == "2026-09-08"